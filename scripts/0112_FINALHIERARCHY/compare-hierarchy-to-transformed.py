@@ -17,23 +17,22 @@ Ignored differences:
 
 from __future__ import annotations
 
-import json
 import re
+import sys
 from collections import defaultdict
 from pathlib import Path
 from collections import Counter
 
+# The label rules and the JSON codec live in the shared scripts/ontology_tools
+# package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-IGNORE_LABELS = {"(Specializations)", "(Atomic Tasks)"}
-ONET_RE = re.compile(r"^\(O\*Net\)\s+(.+?)\s+-\s+")
-PAREN_RE = re.compile(r"\s*\(([^()]*)\)")
-VERB_SENSE_RE = re.compile(r"\b[^\s,()]+\.v\.\d+[A-Za-z0-9]*\b")
-# Duplicate-title disambiguation: "Foo (1)" vs "Foo". Use 1–3 digits so "(2024)" is not stripped.
-DUP_TITLE_SUFFIX_RE = re.compile(r"\s*\(\d{1,3}\)\s*$")
+from ontology_tools import json_codec  # noqa: E402
+from ontology_tools.labels import normalize_label, normalize_whitespace  # noqa: E402
 
 
-def normalize_whitespace(text: str) -> str:
-    return " ".join(text.split())
+IGNORE_LABELS = {"(Specializations)", "(Atomic Tasks)"}
+ONET_RE = re.compile(r"^\(O\*Net\)\s+(.+?)\s+-\s+")
 
 
 def should_ignore_intermediary(label: str) -> bool:
@@ -45,47 +44,6 @@ def should_ignore_intermediary(label: str) -> bool:
     return False
 
 
-def strip_non_substantive_parenthetical(label: str) -> str:
-    """
-    Remove parenthetical chunks that are purely formatting differences:
-    - Synonym lists, e.g. "(Synonyms: ...)"
-    - Verb sense lists, e.g. "(Develop.v.01, Generate.v.01)"
-    """
-
-    def replace(match: re.Match[str]) -> str:
-        inner = normalize_whitespace(match.group(1))
-        lowered = inner.lower()
-        if lowered.startswith("synonyms:"):
-            return ""
-        if VERB_SENSE_RE.search(inner):
-            return ""
-        return match.group(0)
-
-    return PAREN_RE.sub(replace, label)
-
-
-def strip_duplicate_title_suffixes(label: str) -> str:
-    """
-    Remove trailing (n) suffixes added to differentiate duplicate node titles,
-    e.g. "Some concept (1)" -> "Some concept". Applied after synonym/verb-sense stripping.
-    Only 1–3 digit indices (avoids treating years like (2024) as duplicate tags).
-    """
-    s = label.strip()
-    while True:
-        m = DUP_TITLE_SUFFIX_RE.search(s)
-        if not m:
-            break
-        s = s[: m.start()].rstrip()
-    return s
-
-
-def normalize_label(label: str) -> str:
-    label = strip_non_substantive_parenthetical(label)
-    label = strip_duplicate_title_suffixes(label)
-    label = normalize_whitespace(label.strip())
-    return label
-
-
 def extract_onet_id(text: str) -> str | None:
     match = ONET_RE.match(text.strip())
     return match.group(1).strip() if match else None
@@ -409,10 +367,8 @@ def main() -> None:
     report_path = base / "032326_jsonformatdiffs.md"
     patterns_report_path = base / "032326_jsonformatdiffs_patterns.md"
 
-    with open(legacy_path, encoding="utf-8") as f:
-        legacy_data = json.load(f)
-    with open(edited_path, encoding="utf-8") as f:
-        edited_data = json.load(f)
+    legacy_data = json_codec.read_json(legacy_path)
+    edited_data = json_codec.read_json(edited_path)
 
     legacy_concept_paths: set[tuple[str, ...]] = set()
     legacy_onet_locations: dict[str, set[tuple[str, ...]]] = defaultdict(set)
@@ -21,17 +21,35 @@ are treated as ignorable or normalized (legacy key-tree vs node-object format su
 
 This file performs the transform and write only; it does not diff two inputs. For
 side-by-side comparison logic, see `compare-ontology/compare-hierarchy-to-transformed.py`.
+
+With `OUTPUT_FORMAT = "graph"` the same tree is written instead as a flat
+`<FILE_NAME>.graph.json` in the `som-ontology-snapshot-v1` shape (`nodes` plus
+`parentId`/`childId` `edges`). Node ids are hashes of the node's content and its
+children's ids, so a subtree that occurs under several parents is stored once.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
 import sys
 from typing import Any, Dict, List, MutableMapping, Optional, Tuple
 
+# JSON goes through the shared codec in scripts/ontology_tools (orjson when
+# installed, byte-identical to the json module either way)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ontology_tools import json_codec  # noqa: E402
+
 FILE_NAME = "0112_FINALHIERARCHY"
+# "tree" writes the nested `.transformed.json`; "graph" the flat `.graph.json`
+OUTPUT_FORMAT = "tree"
+
+SNAPSHOT_SCHEMA_VERSION = "som-ontology-snapshot-v1"
+# Hex digits of the content hash kept as node id
+GRAPH_ID_LENGTH = 20
 
 # Carries synonym line for `description`; stripped before traversing children.
 STAGING_SYNONYM_DESC_KEY = "__stagingSynonyms"
@@ -40,6 +58,8 @@ STAGING_SYNSETS_KEY = "__stagingSynsets"
 
 JsonValue = Any
 JsonObject = Dict[str, JsonValue]
+# Lowercase base title -> digest of the children signatures -> designation index
+DesignationRegistry = MutableMapping[str, Dict[bytes, int]]
 
 
 def parse_ontology_title(
@@ -285,10 +305,6 @@ def is_collection_key(key: str) -> bool:
     )
 
 
-def are_children_same(a: List[str], b: List[str]) -> bool:
-    return len(a) == len(b) and all(a[i] == b[i] for i in range(len(a)))
-
-
 def canonicalize_for_signature(value: JsonValue) -> JsonValue:
     if value is None:
         return None
@@ -321,7 +337,7 @@ def canonicalize_for_signature(value: JsonValue) -> JsonValue:
 
 def build_structure_signature(value: JsonValue) -> str:
     try:
-        return json.dumps(
+        return json_codec.dumps(
             canonicalize_for_signature(value), sort_keys=True, separators=(",", ":")
         )
     except (TypeError, ValueError):
@@ -354,25 +370,26 @@ def collect_child_structure_signatures(obj: JsonValue) -> List[str]:
     return signatures
 
 
+def signature_digest(children_signatures: List[str]) -> bytes:
+    encoded = json_codec.dumps(
+        children_signatures, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).digest()
+
+
 def designate_title(
     base_display: str,
     children_signatures: List[str],
-    seen: MutableMapping[str, List[Dict[str, List[str]]]],
+    seen: DesignationRegistry,
 ) -> str:
-    key = base_display.lower()
-    existing = seen.get(key) or []
-    match_idx = -1
-    for i, ev in enumerate(existing):
-        if are_children_same(ev["childrenSignatures"], children_signatures):
-            match_idx = i
-            break
-
-    if match_idx == -1:
-        existing.append({"childrenSignatures": list(children_signatures)})
-        seen[key] = existing
-        idx = len(existing) - 1
-        return base_display if idx == 0 else f"{base_display} ({idx})"
-    return base_display if match_idx == 0 else f"{base_display} ({match_idx})"
+    """
+    `base_display`, numbered " (n)" when nodes with the same lowercase base
+    title but different child structure were seen before; variants are numbered
+    in the order they are first seen.
+    """
+    variants = seen.setdefault(base_display.lower(), {})
+    idx = variants.setdefault(signature_digest(children_signatures), len(variants))
+    return base_display if idx == 0 else f"{base_display} ({idx})"
 
 
 def deep_equal_json(a: JsonValue, b: JsonValue) -> bool:
@@ -431,7 +448,7 @@ def put_transformed_sibling(
 
 def transform_ontology(
     input_val: JsonValue,
-    seen: MutableMapping[str, List[Dict[str, List[str]]]],
+    seen: DesignationRegistry,
 ) -> JsonObject:
     if input_val is None:
         return {}
@@ -492,26 +509,108 @@ def transform_ontology(
     return output
 
 
+def content_node_id(node: JsonObject, child_ids: List[str]) -> str:
+    content = [
+        node.get("title", ""),
+        node.get("description", ""),
+        node.get("synsets", ""),
+        node.get("parts") or [],
+        child_ids,
+    ]
+    encoded = json_codec.dumps(content, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:GRAPH_ID_LENGTH]
+
+
+def flatten_dn_graph(transformed: JsonObject) -> JsonObject:
+    """
+    Flat `nodes`/`edges` form of the output of `wrap_dn_root`. Identical
+    subtrees get the same content hash id and are emitted once; nodes are
+    listed parents first.
+    """
+    children_by_id: Dict[str, List[str]] = {}
+    nodes_by_id: Dict[str, JsonObject] = {}
+    id_by_object: Dict[int, str] = {}
+    post_order: List[str] = []
+    occurrences = 0
+
+    stack: List[Tuple[JsonObject, bool]] = [
+        (node, False) for node in reversed(list(transformed.values()))
+    ]
+    while stack:
+        node, expanded = stack.pop()
+        children = list((node.get("specializations") or {}).values())
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        occurrences += 1
+        child_ids = [id_by_object[id(child)] for child in children]
+        node_id = content_node_id(node, child_ids)
+        id_by_object[id(node)] = node_id
+        if node_id in nodes_by_id:
+            continue
+        flat: JsonObject = {
+            "id": node_id,
+            "title": node.get("title", ""),
+            "description": node.get("description", ""),
+        }
+        if node.get("synsets"):
+            flat["synsets"] = node["synsets"]
+        if node.get("parts"):
+            flat["parts"] = node["parts"]
+        nodes_by_id[node_id] = flat
+        children_by_id[node_id] = child_ids
+        post_order.append(node_id)
+
+    ordered_ids = list(reversed(post_order))
+    root_ids = list(
+        dict.fromkeys(id_by_object[id(node)] for node in transformed.values())
+    )
+    graph: JsonObject = {"schemaVersion": SNAPSHOT_SCHEMA_VERSION}
+    if len(root_ids) == 1:
+        graph["branchRootNodeId"] = root_ids[0]
+    graph["rootNodeIds"] = root_ids
+    graph["nodes"] = [nodes_by_id[node_id] for node_id in ordered_ids]
+    graph["edges"] = [
+        {"parentId": parent_id, "childId": child_id, "collectionName": "main"}
+        for parent_id in ordered_ids
+        for child_id in dict.fromkeys(children_by_id[parent_id])
+    ]
+    graph["occurrences"] = occurrences
+    return graph
+
+
 def main() -> None:
     script_dir = os.path.dirname(os.path.abspath(__file__))
     json_path = os.path.join(script_dir, f"{FILE_NAME}.json")
     try:
-        with open(json_path, encoding="utf-8") as f:
-            ontology_object = json.load(f)
+        ontology_object = json_codec.read_json(json_path)
     except FileNotFoundError:
         print(f"Missing input file: {json_path}", file=sys.stderr)
         sys.exit(1)
 
     try:
-        seen_map: Dict[str, List[Dict[str, List[str]]]] = {}
+        seen_map: DesignationRegistry = {}
         normalized_tree = transform_ontology(ontology_object, seen_map)
         transformed = wrap_dn_root(normalized_tree)
 
-        out_path = os.path.join(script_dir, f"{FILE_NAME}.transformed.json")
+        if OUTPUT_FORMAT == "graph":
+            output = flatten_dn_graph(transformed)
+            out_path = os.path.join(script_dir, f"{FILE_NAME}.graph.json")
+        elif OUTPUT_FORMAT == "tree":
+            output = transformed
+            out_path = os.path.join(script_dir, f"{FILE_NAME}.transformed.json")
+        else:
+            raise ValueError(f"Unknown OUTPUT_FORMAT: {OUTPUT_FORMAT!r}")
         with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(transformed, f, indent=2, ensure_ascii=False)
+            json_codec.dump(output, f, indent=2, ensure_ascii=False)
             f.write("\n")
         print("Wrote:", out_path)
+        if OUTPUT_FORMAT == "graph":
+            print(
+                f"{len(output['nodes'])} nodes, {len(output['edges'])} edges "
+                f"for {output['occurrences']} node occurrences"
+            )
     except Exception as err:
         print(err, file=sys.stderr)
         sys.exit(1)
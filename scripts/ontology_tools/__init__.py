@@ -0,0 +1,7 @@
+"""
+Shared Python helpers for the ontology classification and hierarchy scripts.
+
+The scripts in `scripts/` (and `scripts/0112_FINALHIERARCHY/`) stay runnable as
+plain files; anything they have in common lives in this package so it can be
+imported from each of them.
+"""
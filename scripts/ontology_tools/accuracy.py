@@ -0,0 +1,359 @@
+"""
+Accuracy-vs-cost benchmark of classification variants against human labels.
+
+Runs taaft-classification.py once per variant (model, reasoning effort,
+`search_limit`, ontology format, or any other setting) over the human-annotated
+`TAAFT_human_annotation_trial.csv` and scores the chosen nodes against the
+annotators' ones:
+
+- exact: same title after `normalize_label` and case folding,
+- related: the same node, or one is an ancestor of the other,
+- credit: 1 / (1 + d), where d is the number of edges between the two nodes
+  through their nearest common generalization (0 when they share none).
+
+`related` and `credit` need the ontology (`--ontology`, a snapshot, transformed
+hierarchy or compiled file); titles are resolved with `TitleIndex`. Unlabelled
+rows are skipped; labelled rows a variant did not classify count as misses.
+
+The script's requests go through the record/replay layer (ontology_tools/
+replay.py). In the default "cache" mode each distinct request is sent once and
+recorded in the fixtures file, and later runs of the same variant are free;
+"replay" never touches the network (requests that were not recorded fail the
+row). Replayed calls take no time unless `--latency` or
+`--seconds-per-output-token` simulate it, so compare wall times of live runs or
+simulated ones, not a mix. Run it from the scripts directory:
+
+    python -m ontology_tools.accuracy taaft-classification.py \\
+        --fixtures taaft_fixtures.jsonl --ontology ontology-snapshot.json \\
+        --effort low medium high --search-limit 10 100
+
+The table lists every variant with its scores, tokens, cost and wall time, and
+marks the Pareto-optimal ones: no other variant is at least as accurate (by
+`--objective`) with at most as many tokens and as much wall time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import tempfile
+import time
+from typing import Any, Iterable
+
+from .benchmark import run_script
+from .compiled import load_graph
+from .replay import SimulationProfile
+from .titles import TitleIndex, title_key
+
+ANNOTATIONS = "TAAFT_human_annotation_trial.csv"
+LABEL_COLUMN = "Most Appropriate Generalization Node"
+PREDICTION_COLUMN = "SAClassification"
+KEY_COLUMN = "Name"
+
+# Grid flags and the script settings they vary
+GRID_SETTINGS = {
+    "model": "classification_model",
+    "effort": "reasoning_effort",
+    "search_limit": "search_limit",
+    "ontology_format": "ontology_format",
+    "prune_mode": "prune_mode",
+}
+
+
+def read_column(path: str, column: str, key_column: str = KEY_COLUMN) -> dict:
+    """`{key: value}` of the non-empty values of `column` in a CSV file."""
+    values = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            value = (row.get(column) or "").strip()
+            if value:
+                values[row[key_column]] = value
+    return values
+
+
+def prediction_title(value: str) -> str:
+    """Node title of a `title: \\nrationale` classification value."""
+    return value.split(": \n", 1)[0].strip()
+
+
+class OntologyDistance:
+    """Edge distance between titled nodes through a common generalization."""
+
+    def __init__(self, index: TitleIndex) -> None:
+        self.index = index
+        self.graph = index.graph
+        self._depths: dict[int, dict[int, int]] = {}
+
+    def nodes(self, title: str) -> list[int]:
+        resolution = self.index.resolve(title)
+        return [self.graph.index(node_id) for node_id in resolution["ids"]]
+
+    def _ancestor_depths(self, node: int) -> dict[int, int]:
+        depths = self._depths.get(node)
+        if depths is None:
+            depths = self._depths[node] = dict(self.graph.bfs(node, reverse=True))
+        return depths
+
+    def distance(self, title: str, other: str) -> int | None:
+        """Fewest edges between the nodes of two titles, or None if unrelated."""
+        best = None
+        for node in self.nodes(title):
+            depths = self._ancestor_depths(node)
+            for other_node in self.nodes(other):
+                for ancestor, depth in self._ancestor_depths(other_node).items():
+                    if ancestor in depths:
+                        total = depths[ancestor] + depth
+                        if best is None or total < best:
+                            best = total
+        return best
+
+    def related(self, title: str, other: str) -> bool:
+        """The same node, or one an ancestor of the other."""
+        for node in self.nodes(title):
+            depths = self._ancestor_depths(node)
+            for other_node in self.nodes(other):
+                if other_node in depths or node in self._ancestor_depths(other_node):
+                    return True
+        return False
+
+
+def score(
+    labels: dict[str, str],
+    predictions: dict[str, str],
+    distance: OntologyDistance | None = None,
+) -> dict[str, Any]:
+    """Agreement of `predictions` with `labels` (both `{key: title}`)."""
+    exact = related = 0
+    credit = 0.0
+    for key, label in labels.items():
+        predicted = predictions.get(key)
+        if predicted is None:
+            continue
+        is_exact = title_key(predicted) == title_key(label)
+        exact += is_exact
+        if distance is None:
+            continue
+        if is_exact:
+            related += 1
+            credit += 1.0
+            continue
+        related += distance.related(predicted, label)
+        edges = distance.distance(predicted, label)
+        if edges is not None:
+            credit += 1 / (1 + edges)
+
+    labelled = len(labels)
+    scores: dict[str, Any] = {
+        "labelled": labelled,
+        "answered": sum(1 for key in labels if key in predictions),
+        "exact": round(exact / labelled, 4) if labelled else None,
+    }
+    if distance is not None:
+        scores["related"] = round(related / labelled, 4) if labelled else None
+        scores["credit"] = round(credit / labelled, 4) if labelled else None
+    return scores
+
+
+def grid_variants(grid: dict[str, list[str]]) -> list[dict[str, Any]]:
+    """One variant per combination of the grid values (Python source strings)."""
+    names = [name for name, values in grid.items() if values]
+    variants = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        settings = {GRID_SETTINGS[name]: value for name, value in zip(names, values)}
+        label = ",".join(f"{name}={value}" for name, value in zip(names, values))
+        variants.append({"name": label or "default", "settings": settings})
+    return variants
+
+
+def pareto_front(rows: list[dict], objective: str) -> None:
+    """Mark rows that no other row dominates on (objective, tokens, wall time)."""
+
+    def costs(row: dict) -> tuple[float, float, float]:
+        return (-(row[objective] or 0), row["tokens"], row["wallSeconds"])
+
+    for row in rows:
+        mine = costs(row)
+        row["pareto"] = not any(
+            all(a <= b for a, b in zip(costs(other), mine)) and costs(other) != mine
+            for other in rows
+            if other is not row
+        )
+
+
+def benchmark(
+    script_path: str,
+    variants: Iterable[dict[str, Any]],
+    fixtures_path: str,
+    api_mode: str,
+    profile: SimulationProfile,
+    labels: dict[str, str],
+    distance: OntologyDistance | None,
+    output_dir: str,
+    input_path: str,
+) -> list[dict]:
+    rows = []
+    for number, variant in enumerate(variants, 1):
+        run_dir = os.path.join(output_dir, f"variant-{number}")
+        os.makedirs(run_dir, exist_ok=True)
+        output_path = os.path.join(run_dir, "output.csv")
+        overrides = {
+            "api_mode": repr(api_mode),
+            "fixtures_path": repr(os.path.abspath(fixtures_path)),
+            "simulation": repr(profile),
+            "replay_on_missing": '"error"',
+            "run_mode": '"sync"',
+            "result_store": '"csv"',
+            "output_file_path": repr(output_path),
+            "metrics_path": repr(os.path.join(run_dir, "metrics.jsonl")),
+            "batch_requests_path": repr(os.path.join(run_dir, "batch.jsonl")),
+            "csv_file_path": repr(os.path.abspath(input_path)),
+            **variant["settings"],
+        }
+        started = time.perf_counter()
+        namespace = run_script(
+            script_path, overrides, os.path.join(run_dir, "run.log")
+        )
+        wall = time.perf_counter() - started
+        summary = namespace["metrics"].summary(namespace["scheduler"].stats)
+
+        predictions = {
+            key: prediction_title(value)
+            for key, value in read_column(output_path, PREDICTION_COLUMN).items()
+        }
+        row = {
+            "variant": variant["name"],
+            **score(labels, predictions, distance),
+            "failed": summary["failed"],
+            "tokens": summary["tokens"]["total"],
+            "cost": summary["cost"],
+            "wallSeconds": round(wall, 2),
+            "requestP50": summary["requestSeconds"]["p50"],
+            "output": output_path,
+        }
+        rows.append(row)
+        print(
+            f"{row['variant']}: exact {row['exact']}, {row['tokens']} tokens, "
+            f"{row['wallSeconds']}s"
+        )
+    return rows
+
+
+def format_table(rows: list[dict], objective: str) -> str:
+    columns = ["variant", "exact", "related", "credit", "answered", "failed"]
+    columns += ["tokens", "cost", "wallSeconds", "requestP50", "pareto"]
+    columns = [column for column in columns if column in rows[0]]
+    lines = [
+        "| " + " | ".join(columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    for row in sorted(rows, key=lambda row: (-(row[objective] or 0), row["tokens"])):
+        cells = [
+            ("*" if row[column] else "") if column == "pareto" else str(row[column])
+            for column in columns
+        ]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("script", help="e.g. taaft-classification.py")
+    parser.add_argument("--fixtures", required=True, help="cache / fixtures file")
+    parser.add_argument("--api-mode", choices=("cache", "replay"), default="cache")
+    parser.add_argument(
+        "--annotations",
+        default=None,
+        help=f"human-annotated CSV (default: {ANNOTATIONS} next to the script)",
+    )
+    parser.add_argument(
+        "--label-column",
+        default=LABEL_COLUMN,
+        help='annotated node title column (or e.g. "SA Classification")',
+    )
+    parser.add_argument("--ontology", default=None, help="for related/credit scores")
+    parser.add_argument("--model", nargs="+", default=[], help="e.g. gpt-5")
+    parser.add_argument(
+        "--effort", nargs="+", default=[], choices=("minimal", "low", "medium", "high")
+    )
+    parser.add_argument("--search-limit", nargs="+", type=int, default=[])
+    parser.add_argument(
+        "--ontology-format",
+        nargs="+",
+        default=[],
+        choices=("pretty", "json", "outline"),
+    )
+    parser.add_argument(
+        "--prune-mode", nargs="+", default=[], choices=("off", "shadow", "on")
+    )
+    parser.add_argument(
+        "--variants",
+        default=None,
+        help='JSON list of {"name", "settings": {setting: Python source}} '
+        "(instead of the grid flags)",
+    )
+    parser.add_argument(
+        "--objective", choices=("exact", "related", "credit"), default=None
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--seconds-per-output-token", type=float, default=0.0)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--json", default=None, help="also write the rows here")
+    args = parser.parse_args(argv)
+
+    if args.variants:
+        with open(args.variants, encoding="utf-8") as f:
+            variants = json.load(f)
+    else:
+        variants = grid_variants(
+            {
+                "model": [repr(model) for model in args.model],
+                "effort": [repr(effort) for effort in args.effort],
+                "search_limit": [str(limit) for limit in args.search_limit],
+                "ontology_format": [repr(name) for name in args.ontology_format],
+                "prune_mode": [repr(mode) for mode in args.prune_mode],
+            }
+        )
+
+    annotations = args.annotations or os.path.join(
+        os.path.dirname(os.path.abspath(args.script)), ANNOTATIONS
+    )
+    labels = read_column(annotations, args.label_column)
+
+    distance = None
+    if args.ontology:
+        distance = OntologyDistance(TitleIndex(load_graph(args.ontology)))
+    objective = args.objective or ("credit" if distance else "exact")
+    if objective != "exact" and distance is None:
+        parser.error(f"--objective {objective} needs --ontology")
+
+    profile = SimulationProfile(
+        latency_seconds=args.latency,
+        seconds_per_output_token=args.seconds_per_output_token,
+    )
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="classification-accuracy-")
+    rows = benchmark(
+        args.script,
+        variants,
+        args.fixtures,
+        args.api_mode,
+        profile,
+        labels,
+        distance,
+        output_dir,
+        annotations,
+    )
+    pareto_front(rows, objective)
+    print(f"\n{len(labels)} labelled rows, Pareto objective: {objective}\n")
+    print(format_table(rows, objective))
+    print(f"\nOutputs and logs: {output_dir}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
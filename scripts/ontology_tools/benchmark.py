@@ -0,0 +1,189 @@
+"""
+Offline throughput benchmark for the classification scripts.
+
+Runs a classification script in replay mode (see ontology_tools/replay.py) once
+per concurrency setting and reports items/sec, model call latency, 429s and
+where the adaptive concurrency limit settled. Nothing touches the network, so
+it can run on a laptop against fixtures recorded with `api_mode = "record"`.
+
+The scripts are configured through module-level assignments; the benchmark
+runs a copy of the script with those assignments replaced, exactly as one
+would edit them by hand. Run it from the scripts directory:
+
+    python -m ontology_tools.benchmark taaft-classification.py \\
+        --fixtures taaft_fixtures.jsonl --concurrency 1 4 8 16 \\
+        --latency 20 --rate-limit-rate 0.02 --server-concurrency 12
+
+Use `--set name=value` (value as Python source) for any other setting, e.g.
+`--set ontology_format='"outline"'`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any
+
+from .replay import SimulationProfile
+
+
+def override_config(source: str, overrides: dict[str, str]) -> str:
+    """Replace the single-line top-level assignment of every name in `overrides`."""
+    for name, value in overrides.items():
+        pattern = re.compile(rf"^{re.escape(name)}\s*=.*$", re.MULTILINE)
+        source, count = pattern.subn(lambda _: f"{name} = {value}", source, count=1)
+        if not count:
+            raise KeyError(f"The script has no top-level setting named {name!r}")
+    return source
+
+
+def run_script(script_path: str, overrides: dict[str, str], log_path: str) -> dict:
+    """Execute the script with `overrides` and return its module namespace."""
+    script_path = os.path.abspath(script_path)
+    with open(script_path, encoding="utf-8") as f:
+        source = override_config(f.read(), overrides)
+    namespace: dict[str, Any] = {"__name__": "__main__", "__file__": script_path}
+    previous_cwd = os.getcwd()
+    os.chdir(os.path.dirname(script_path))
+    try:
+        with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(
+            log
+        ):
+            exec(compile(source, script_path, "exec"), namespace)
+    finally:
+        os.chdir(previous_cwd)
+    return namespace
+
+
+def benchmark(
+    script_path: str,
+    fixtures_path: str,
+    concurrency_levels: list[int],
+    profile: SimulationProfile,
+    extra_overrides: dict[str, str],
+    output_dir: str,
+) -> list[dict]:
+    rows = []
+    for concurrency in concurrency_levels:
+        run_dir = os.path.join(output_dir, f"concurrency-{concurrency}")
+        os.makedirs(run_dir, exist_ok=True)
+        overrides = {
+            "api_mode": '"replay"',
+            "fixtures_path": repr(os.path.abspath(fixtures_path)),
+            "simulation": repr(profile),
+            "max_concurrency": str(concurrency),
+            "output_file_path": repr(os.path.join(run_dir, "output.csv")),
+            "metrics_path": repr(os.path.join(run_dir, "metrics.jsonl")),
+            "batch_requests_path": repr(os.path.join(run_dir, "batch.jsonl")),
+            **extra_overrides,
+        }
+        started = time.perf_counter()
+        namespace = run_script(
+            script_path, overrides, os.path.join(run_dir, "run.log")
+        )
+        wall = time.perf_counter() - started
+        scheduler = namespace["scheduler"]
+        summary = namespace["metrics"].summary(scheduler.stats)
+        rows.append(
+            {
+                "concurrency": concurrency,
+                "items": summary["items"],
+                "classified": summary["classified"],
+                "wallSeconds": round(wall, 2),
+                "itemsPerSecond": round(summary["items"] / wall, 3) if wall else None,
+                "requestP50": summary["requestSeconds"]["p50"],
+                "requestP95": summary["requestSeconds"]["p95"],
+                "rateLimited": scheduler.stats["rateLimited"],
+                "retries": scheduler.stats["retries"],
+                "finalConcurrencyLimit": scheduler.limiter.limit,
+                "log": os.path.join(run_dir, "run.log"),
+            }
+        )
+        print(
+            f"concurrency {concurrency}: {rows[-1]['itemsPerSecond']} items/s "
+            f"({summary['items']} items in {wall:.1f}s)"
+        )
+    return rows
+
+
+def format_table(rows: list[dict]) -> str:
+    columns = [
+        "concurrency",
+        "items",
+        "classified",
+        "wallSeconds",
+        "itemsPerSecond",
+        "requestP50",
+        "requestP95",
+        "rateLimited",
+        "retries",
+        "finalConcurrencyLimit",
+    ]
+    lines = [
+        "| " + " | ".join(columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(str(row[column]) for column in columns) + " |")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("script", help="e.g. taaft-classification.py")
+    parser.add_argument("--fixtures", required=True, help="recorded fixtures file")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--seconds-per-output-token", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.25)
+    parser.add_argument("--retrieval-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--server-concurrency", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--on-missing",
+        choices=("error", "any"),
+        default="any",
+        help="answer requests missing from the fixtures with any recorded one",
+    )
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE")
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--json", default=None, help="also write the rows here")
+    args = parser.parse_args(argv)
+
+    profile = SimulationProfile(
+        latency_seconds=args.latency,
+        seconds_per_output_token=args.seconds_per_output_token,
+        latency_jitter=args.jitter,
+        retrieval_latency_seconds=args.retrieval_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        server_concurrency=args.server_concurrency,
+        seed=args.seed,
+    )
+    extra = {"replay_on_missing": repr(args.on_missing)}
+    for assignment in args.set:
+        name, _, value = assignment.partition("=")
+        extra[name.strip()] = value.strip()
+
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="classification-bench-")
+    rows = benchmark(
+        args.script, args.fixtures, args.concurrency, profile, extra, output_dir
+    )
+    print()
+    print(format_table(rows))
+    print(f"\nOutputs and logs: {output_dir}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Two-tier model cascade for the classification scripts.
+
+Most items are easy, and a high reasoning effort (whose reasoning tokens are
+billed as output) dominates both cost and latency. A `ModelCascade` therefore
+classifies every item with a cheap first model (a smaller model and/or a low
+reasoning effort) and only escalates to the final model when the first answer
+cannot be trusted:
+
+- the request failed or the response does not validate,
+- the chosen node is not one of the nodes supplied in the prompt,
+- the self-reported "confidence" is missing or below the threshold.
+
+Every result is tagged with its "cascadeTier" ("first" or "final") and the first
+one with its "escalationReason" and the "finalModel", so `cascade_record` can
+rebuild per item what the cascade did, what each tier cost and what the first
+answer would have cost at the final model's prices.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+from .llm import ChatModel, estimate_cost
+
+# Appended to the static instructions in cascade mode; it overrides their
+# "exactly these keys" / "no extra keys" output rules for this one key
+CONFIDENCE_INSTRUCTION = """
+## Confidence:
+This overrides the output specification above: the JSON object must also include a "confidence" key, a number between 0 and 1 stating how confident you are that most_appropriate_node is the best of the supplied nodes. "confidence" is the only key allowed besides the keys listed above.
+"""
+
+
+def response_confidence(response: Any) -> float | None:
+    if not isinstance(response, dict):
+        return None
+    try:
+        return float(response.get("confidence"))
+    except (TypeError, ValueError):
+        return None
+
+
+def escalation_reason(
+    result: dict,
+    validated: Any,
+    allowed_titles: Iterable[str] | None = None,
+    confidence_threshold: float | None = None,
+) -> str | None:
+    """Why the first-tier `result` must be escalated, or None to accept it."""
+    if "responseObject" not in result:
+        return "request failed"
+    if not validated:
+        return "invalid response"
+    response = result["responseObject"]
+    node = response.get("most_appropriate_node")
+    title = node.get("title") if isinstance(node, dict) else None
+    if allowed_titles is not None and title not in allowed_titles:
+        return "title not in sub-ontology"
+    if confidence_threshold is not None:
+        confidence = response_confidence(response)
+        if confidence is None:
+            return "no confidence"
+        if confidence < confidence_threshold:
+            return "low confidence"
+    return None
+
+
+class ModelCascade:
+    """
+    `first` answers every item; `final` (the regular model) only the escalated
+    ones. `complete` and `complete_valid` mirror `ChatModel`.
+    """
+
+    def __init__(
+        self,
+        first: ChatModel,
+        final: ChatModel,
+        confidence_threshold: float | None = 0.7,
+    ) -> None:
+        self.first = first
+        self.final = final
+        self.confidence_threshold = confidence_threshold
+
+    def _tag_first(self, result: dict) -> dict:
+        result["cascadeTier"] = "first"
+        result["finalModel"] = self.final.model
+        return result
+
+    def complete(self, prompt: str) -> dict:
+        """First-tier result for `prompt`."""
+        return self._tag_first(self.first.complete(prompt))
+
+    def complete_valid(
+        self,
+        prompt: str,
+        validate: Callable[[dict], Any],
+        retries: int = 3,
+        first_result: dict | None = None,
+        results: list | None = None,
+        allowed_titles: Iterable[str] | None = None,
+    ) -> Any:
+        """
+        Returns `validate(result)` of the first-tier result when it needs no
+        escalation, otherwise what `final.complete_valid` returns after up to
+        `retries` attempts. `first_result`, when given (e.g. from a batch), is
+        used as the first-tier answer. New results are appended to `results`.
+        """
+        result = first_result
+        if result is None:
+            result = self.complete(prompt)
+            if results is not None:
+                results.append(result)
+        self._tag_first(result)
+
+        validated = validate(result) if "responseObject" in result else None
+        reason = escalation_reason(
+            result, validated, allowed_titles, self.confidence_threshold
+        )
+        if reason is None:
+            return validated
+
+        result["escalationReason"] = reason
+        print(
+            f"Escalating to {self.final.model} "
+            f"({self.final.reasoning_effort} effort): {reason}"
+        )
+        final_results: list[dict] = []
+        validated = self.final.complete_valid(
+            prompt, validate, retries, results=final_results
+        )
+        for final_result in final_results:
+            final_result["cascadeTier"] = "final"
+        if results is not None:
+            results.extend(final_results)
+        return validated
+
+
+def cascade_record(results: Iterable[dict]) -> dict | None:
+    """
+    What the cascade did for one item, from its tagged results: whether and
+    why it escalated, the cost of each tier and the first tier's tokens priced
+    at the final model's rates. None if no result is tagged.
+    """
+    results = [result for result in results or [] if result]
+    tagged = [result for result in results if result.get("cascadeTier")]
+    if not tagged:
+        return None
+    reason = next(
+        (r["escalationReason"] for r in tagged if r.get("escalationReason")), None
+    )
+    costs = {"first": 0.0, "final": 0.0}
+    first_at_final = 0.0
+    for result in tagged:
+        cost = float((result.get("cost") or {}).get("totalCost", 0) or 0)
+        costs[result["cascadeTier"]] += cost
+        if result["cascadeTier"] == "first":
+            tokens = result.get("usedTokens") or {}
+            first_at_final += float(
+                estimate_cost(
+                    int(tokens.get("input", 0) or 0),
+                    int(tokens.get("output", 0) or 0),
+                    int(tokens.get("thinking", 0) or 0),
+                    model=result.get("finalModel"),
+                )["totalCost"]
+            )
+    return {
+        "escalated": reason is not None,
+        "reason": reason,
+        "confidence": response_confidence(tagged[0].get("responseObject")),
+        "firstCost": round(costs["first"], 6),
+        "finalCost": round(costs["final"], 6),
+        "firstAtFinalCost": round(first_at_final, 6),
+    }
@@ -0,0 +1,128 @@
+"""
+Precomputed ancestor closure of an `OntologyGraph`.
+
+The ontology is a DAG: a node can be reached through several parents ("Express
+information" is under both "Act on what?" and "Act how?"). `ClosureIndex`
+stores, for every node, the set of all its ancestors (the transitive closure of
+the parent relation, row by row), so
+
+- "is X under Y" is one set membership test,
+- "all ancestors of X" is a lookup,
+- "lowest common generalizations of X and Y" intersects two ancestor sets and
+  keeps the members that are not an ancestor of another member.
+
+Ancestor sets are as large as the number of generalizations of a node, not the
+size of the ontology, so the index stays small where a full bitset matrix would
+grow with the square of the node count. Edges can be added and removed
+afterwards; only the descendants of the edge's child are updated.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable
+
+from .graph import OntologyGraph
+
+
+class ClosureIndex:
+    def __init__(self, graph: OntologyGraph) -> None:
+        self.graph = graph
+        count = len(graph)
+        self.parents: list[set[int]] = [set(graph.parents(i)) for i in range(count)]
+        self.children: list[set[int]] = [set(graph.children(i)) for i in range(count)]
+        self._ancestors: list[frozenset[int]] = [frozenset()] * count
+        self._recompute(range(count))
+
+    def _recompute(self, nodes: Iterable[int]) -> None:
+        """Rebuild the ancestor sets of `nodes` from their parents' sets."""
+        nodes = set(nodes)
+        pending = {
+            node: sum(1 for parent in self.parents[node] if parent in nodes)
+            for node in nodes
+        }
+        queue = deque(node for node, count in pending.items() if count == 0)
+        while queue:
+            node = queue.popleft()
+            del pending[node]
+            self._ancestors[node] = self._inherited(node)
+            for child in self.children[node]:
+                if child in pending:
+                    pending[child] -= 1
+                    if pending[child] == 0:
+                        queue.append(child)
+
+        # Whatever is left sits on or below a cycle: iterate to a fixed point
+        for node in pending:
+            self._ancestors[node] = frozenset()
+        changed = bool(pending)
+        while changed:
+            changed = False
+            for node in pending:
+                ancestors = self._inherited(node)
+                if ancestors != self._ancestors[node]:
+                    self._ancestors[node] = ancestors
+                    changed = True
+
+    def _inherited(self, node: int) -> frozenset[int]:
+        ancestors = set(self.parents[node])
+        for parent in self.parents[node]:
+            ancestors |= self._ancestors[parent]
+        return frozenset(ancestors)
+
+    def is_under(self, node: int, ancestor: int) -> bool:
+        """Whether `ancestor` is a (strict) generalization of `node`."""
+        return ancestor in self._ancestors[node]
+
+    def ancestors(self, node: int) -> frozenset[int]:
+        """Every node above `node`; includes `node` only if it is on a cycle."""
+        return self._ancestors[node]
+
+    def descendants(self, node: int) -> set[int]:
+        """Every node below `node`, found by walking the current child edges."""
+        seen: set[int] = set()
+        stack = list(self.children[node])
+        while stack:
+            child = stack.pop()
+            if child not in seen:
+                seen.add(child)
+                stack.extend(self.children[child])
+        return seen
+
+    def lowest_common_generalizations(self, first: int, second: int) -> list[int]:
+        """
+        The most specific nodes that are (or are above) both `first` and
+        `second`, in graph order. A node counts as its own generalization, so
+        the answer for a node and one of its descendants is the node itself.
+        """
+        common = (self._ancestors[first] | {first}) & (
+            self._ancestors[second] | {second}
+        )
+        covered: set[int] = set()
+        for node in common:
+            covered |= self._ancestors[node]
+        return sorted(common - covered)
+
+    def add_edge(self, parent: int, child: int) -> bool:
+        """Add `parent -> child`; False if the edge already exists."""
+        if parent in self.parents[child]:
+            return False
+        self.parents[child].add(parent)
+        self.children[parent].add(child)
+        affected = self.descendants(child) | {child}
+        if parent in affected:
+            self._recompute(affected)
+        else:
+            inherited = self._ancestors[parent] | {parent}
+            for node in affected:
+                self._ancestors[node] = self._ancestors[node] | inherited
+        return True
+
+    def remove_edge(self, parent: int, child: int) -> bool:
+        """Remove `parent -> child`; False if there is no such edge."""
+        if parent not in self.parents[child]:
+            return False
+        self.parents[child].discard(parent)
+        self.children[parent].discard(child)
+        self._recompute(self.descendants(child) | {child})
+        return True
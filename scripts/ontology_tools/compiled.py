@@ -0,0 +1,316 @@
+"""
+Compiled binary ontology files, loaded with `mmap`.
+
+`json.load` of a multi-MB ontology dominates the startup of short tasks. The
+compile step turns a snapshot or `.transformed.json` hierarchy into one binary
+file that a `MappedOntologyGraph` maps read-only: opening it reads only the
+header, and nodes, titles and edges are read from the mapped pages on access.
+Worker processes that map the same file share its pages.
+
+    python -m ontology_tools.compiled ontology-snapshot.json ontology.somg
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header          magic, version, node/edge/string/collection counts, root
+                    node (-1 if none), then the byte offset of every section
+    string_offsets  u64 x (strings + 1)  start of each string in string_data
+    string_data     UTF-8 bytes of every distinct string
+    node_strings    u32 x 3 x nodes      id, title and description string
+    child_offsets   u32 x (nodes + 1)    CSR by parent, as in `OntologyGraph`
+    child_index     u32 x edges
+    child_collection u32 x edges         collection number of each child edge
+    parent_offsets  u32 x (nodes + 1)    CSR by child
+    parent_index    u32 x edges
+    id_order        u32 x nodes          nodes sorted by id (binary search)
+    title_order     u32 x nodes          nodes sorted by title
+    collections     u32 x collections    string of each collection name
+"""
+
+from __future__ import annotations
+
+import argparse
+import mmap
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+from typing import Any
+
+from . import json_codec
+from .graph import OntologyGraph
+from .snapshot import is_snapshot, validate_snapshot
+
+MAGIC = b"SOMGRAPH"
+FORMAT_VERSION = 1
+
+SECTIONS = (
+    "string_offsets",
+    "string_data",
+    "node_strings",
+    "child_offsets",
+    "child_index",
+    "child_collection",
+    "parent_offsets",
+    "parent_index",
+    "id_order",
+    "title_order",
+    "collections",
+)
+_HEADER = struct.Struct(f"<8sIIIIIi{len(SECTIONS)}Q")
+_ALIGNMENT = 8
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def compile_graph(graph: OntologyGraph, path: str) -> None:
+    """Write `graph` to `path` in the compiled format."""
+    strings: list[bytes] = []
+    numbers: dict[str, int] = {}
+
+    def string_number(text: str) -> int:
+        number = numbers.get(text)
+        if number is None:
+            number = numbers[text] = len(strings)
+            strings.append(text.encode("utf-8"))
+        return number
+
+    node_strings = array("I")
+    for i in range(len(graph)):
+        node_strings.append(string_number(graph.ids[i]))
+        node_strings.append(string_number(graph.titles[i]))
+        node_strings.append(string_number(graph.descriptions[i]))
+    collections = array("I", (string_number(n) for n in graph.collection_names))
+
+    string_offsets = array("Q", [0])
+    for encoded in strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+    id_order = sorted(range(len(graph)), key=lambda i: strings[node_strings[3 * i]])
+    title_order = sorted(
+        range(len(graph)), key=lambda i: (strings[node_strings[3 * i + 1]], i)
+    )
+
+    sections = {
+        "string_offsets": _little_endian(string_offsets),
+        "string_data": b"".join(strings),
+        "node_strings": _little_endian(node_strings),
+        "child_offsets": _little_endian(array("I", graph.child_offsets)),
+        "child_index": _little_endian(array("I", graph.child_index)),
+        "child_collection": _little_endian(array("I", graph.child_collection)),
+        "parent_offsets": _little_endian(array("I", graph.parent_offsets)),
+        "parent_index": _little_endian(array("I", graph.parent_index)),
+        "id_order": _little_endian(array("I", id_order)),
+        "title_order": _little_endian(array("I", title_order)),
+        "collections": _little_endian(collections),
+    }
+    offsets = []
+    position = _HEADER.size
+    for name in SECTIONS:
+        position += -position % _ALIGNMENT
+        offsets.append(position)
+        position += len(sections[name])
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        len(graph),
+        graph.edge_count,
+        len(strings),
+        len(collections),
+        -1 if graph.root is None else graph.root,
+        *offsets,
+    )
+    with open(path, "wb") as f:
+        f.write(header)
+        for name, offset in zip(SECTIONS, offsets):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(sections[name])
+
+
+class _StringColumn(Sequence):
+    """One string field of every node, decoded from the mapped file on access."""
+
+    def __init__(self, graph: "MappedOntologyGraph", field: int) -> None:
+        self._graph = graph
+        self._field = field
+
+    def __len__(self) -> int:
+        return self._graph.node_count
+
+    def __getitem__(self, node):
+        if isinstance(node, slice):
+            return [self[i] for i in range(*node.indices(len(self)))]
+        if node < 0:
+            node += len(self)
+        if not 0 <= node < len(self):
+            raise IndexError(node)
+        graph = self._graph
+        return graph.string(graph.node_strings[3 * node + self._field])
+
+
+class MappedOntologyGraph(OntologyGraph):
+    """
+    An `OntologyGraph` backed by a compiled file. The CSR arrays are
+    memoryviews of the mapping; ids and titles are looked up by binary search
+    over the sorted orders stored in the file instead of building dicts.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path}: not a compiled ontology file")
+        if sys.byteorder == "big":
+            self._mmap.close()
+            raise ValueError(f"{path}: compiled files need a little-endian host")
+        (
+            _,
+            version,
+            self.node_count,
+            edge_count,
+            string_count,
+            collection_count,
+            root,
+            *offsets,
+        ) = _HEADER.unpack_from(self._mmap)
+        if version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path}: unsupported format version {version}")
+        self.root = None if root < 0 else root
+
+        sizes = {
+            "string_offsets": 8 * (string_count + 1),
+            "node_strings": 12 * self.node_count,
+            "child_offsets": 4 * (self.node_count + 1),
+            "child_index": 4 * edge_count,
+            "child_collection": 4 * edge_count,
+            "parent_offsets": 4 * (self.node_count + 1),
+            "parent_index": 4 * edge_count,
+            "id_order": 4 * self.node_count,
+            "title_order": 4 * self.node_count,
+            "collections": 4 * collection_count,
+        }
+        view = memoryview(self._mmap)
+        self._views = []
+        for name, offset in zip(SECTIONS, offsets):
+            if name == "string_data":
+                continue
+            section = view[offset : offset + sizes[name]]
+            section = section.cast("Q" if name == "string_offsets" else "I")
+            self._views.append(section)
+            setattr(self, name, section)
+        self._string_data = offsets[SECTIONS.index("string_data")]
+        view.release()
+
+        self.ids = _StringColumn(self, 0)
+        self.titles = _StringColumn(self, 1)
+        self.descriptions = _StringColumn(self, 2)
+        self.collection_names = [self.string(n) for n in self.collections]
+
+    def __reduce__(self):
+        # Worker processes map the file again instead of copying it
+        return type(self), (self.path,)
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def string(self, number: int) -> str:
+        start = self._string_data + self.string_offsets[number]
+        end = self._string_data + self.string_offsets[number + 1]
+        return self._mmap[start:end].decode("utf-8")
+
+    def _raw_string(self, node: int, field: int) -> bytes:
+        number = self.node_strings[3 * node + field]
+        start = self._string_data + self.string_offsets[number]
+        return self._mmap[start : self._string_data + self.string_offsets[number + 1]]
+
+    def _lower_bound(self, order: memoryview, field: int, key: bytes) -> int:
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._raw_string(order[middle], field) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def index(self, node_id: str) -> int:
+        key = node_id.encode("utf-8")
+        position = self._lower_bound(self.id_order, 0, key)
+        if position < len(self.id_order):
+            node = self.id_order[position]
+            if self._raw_string(node, 0) == key:
+                return node
+        raise KeyError(node_id)
+
+    def indices_of_title(self, title: str) -> list[int]:
+        key = title.encode("utf-8")
+        position = self._lower_bound(self.title_order, 1, key)
+        indices = []
+        while position < len(self.title_order):
+            node = self.title_order[position]
+            if self._raw_string(node, 1) != key:
+                break
+            indices.append(node)
+            position += 1
+        return indices
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self) -> "MappedOntologyGraph":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def load_graph(path: str) -> OntologyGraph:
+    """
+    Graph of the compiled file, snapshot or `.transformed.json` hierarchy at
+    `path`; compiled files are mapped, the others parsed.
+    """
+    with open(path, "rb") as f:
+        compiled = f.read(len(MAGIC)) == MAGIC
+    if compiled:
+        return MappedOntologyGraph(path)
+    data = json_codec.read_json(path)
+    if is_snapshot(data):
+        return OntologyGraph.from_snapshot(validate_snapshot(data, path))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a snapshot or a transformed hierarchy")
+    return OntologyGraph.from_transformed(data)
+
+
+def compile_ontology(source_path: str, output_path: str) -> OntologyGraph:
+    graph = load_graph(source_path)
+    compile_graph(graph, output_path)
+    return graph
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help="snapshot or .transformed.json file")
+    parser.add_argument("output", help="compiled file to write, e.g. ontology.somg")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    graph = compile_ontology(args.source, args.output)
+    print(
+        f"Wrote {args.output}: {len(graph)} nodes, {graph.edge_count} edges "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
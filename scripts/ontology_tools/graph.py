@@ -0,0 +1,261 @@
+"""
+Compact integer-indexed graph of a `som-ontology-snapshot-v1` snapshot.
+
+Nodes are numbered 0..n-1 in snapshot order. Ids, titles and collection names
+are interned strings in plain lists; the edges are stored twice in compressed
+sparse row (CSR) form, once by parent and once by child:
+
+    child_offsets[i] .. child_offsets[i + 1]   -> range of child_index
+    parent_offsets[i] .. parent_offsets[i + 1] -> range of parent_index
+
+so the children or parents of a node are a slice of an `array`, found with two
+offset reads. Children keep their snapshot order and `child_collection` holds the
+collection of each child edge. Compared to nested title-keyed dicts this stores
+one machine integer per edge end instead of a dict entry, and BFS/DFS walk the
+arrays without building intermediate objects.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from collections import deque
+from typing import Any, Iterable, Iterator
+
+from .snapshot import Snapshot, load_snapshot, snapshot_root_id
+
+DEFAULT_COLLECTION = "main"
+
+
+def _csr(
+    count: int, sources: array, targets: array
+) -> tuple[array, array, array]:
+    """
+    Offsets and targets grouped by source (a counting sort, stable in edge
+    order), plus the position of each grouped target in the edge list.
+    """
+    offsets = array("l", [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    cursor = array("l", offsets[:-1])
+    grouped = array("l", [0]) * len(targets)
+    order = array("l", [0]) * len(targets)
+    for edge, (source, target) in enumerate(zip(sources, targets)):
+        position = cursor[source]
+        grouped[position] = target
+        order[position] = edge
+        cursor[source] = position + 1
+    return offsets, grouped, order
+
+
+class OntologyGraph:
+    def __init__(
+        self,
+        ids: list[str],
+        titles: list[str],
+        descriptions: list[str],
+        edges: Iterable[tuple[int, int, str]],
+        root: int | None = None,
+    ) -> None:
+        self.ids = ids
+        self.titles = titles
+        self.descriptions = descriptions
+        self.root = root
+        self.index_by_id = {node_id: i for i, node_id in enumerate(ids)}
+        self._indices_by_title: dict[str, list[int]] | None = None
+
+        self.collection_names: list[str] = []
+        collection_numbers: dict[str, int] = {}
+        parents, children, collections = array("l"), array("l"), array("l")
+        seen: set[tuple[int, int, int]] = set()
+        for parent, child, collection in edges:
+            number = collection_numbers.get(collection)
+            if number is None:
+                number = collection_numbers[collection] = len(self.collection_names)
+                self.collection_names.append(sys.intern(collection))
+            if (parent, child, number) in seen:
+                continue
+            seen.add((parent, child, number))
+            parents.append(parent)
+            children.append(child)
+            collections.append(number)
+
+        self.child_offsets, self.child_index, order = _csr(
+            len(ids), parents, children
+        )
+        self.child_collection = array("l", (collections[e] for e in order))
+        self.parent_offsets, self.parent_index, _ = _csr(len(ids), children, parents)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "OntologyGraph":
+        """Graph of `snapshot`; edges to ids without a node are dropped."""
+        ids: list[str] = []
+        titles: list[str] = []
+        descriptions: list[str] = []
+        index_by_id: dict[str, int] = {}
+        for node in snapshot["nodes"]:
+            if node["id"] in index_by_id:
+                continue
+            index_by_id[node["id"]] = len(ids)
+            ids.append(sys.intern(node["id"]))
+            titles.append(sys.intern(node.get("title") or ""))
+            descriptions.append(node.get("description") or "")
+
+        def edges() -> Iterator[tuple[int, int, str]]:
+            for edge in snapshot["edges"]:
+                parent = index_by_id.get(edge["parentId"])
+                child = index_by_id.get(edge["childId"])
+                if parent is not None and child is not None:
+                    collection = edge.get("collectionName") or DEFAULT_COLLECTION
+                    yield parent, child, collection
+
+        root_id = snapshot_root_id(snapshot)
+        return cls(ids, titles, descriptions, edges(), index_by_id.get(root_id))
+
+    @classmethod
+    def from_transformed(cls, tree: dict[str, Any]) -> "OntologyGraph":
+        """
+        Graph of a title-keyed `.transformed.json` hierarchy (see
+        `0112_FINALHIERARCHY/convert-structure.py`). Titles are unique there, so
+        they double as ids; a title repeated under several parents is one node.
+        """
+        ids: list[str] = []
+        descriptions: list[str] = []
+        index_by_id: dict[str, int] = {}
+        edges: list[tuple[int, int, str]] = []
+
+        def visit(title: str, node: Any) -> tuple[int, bool]:
+            if title in index_by_id:
+                return index_by_id[title], False
+            index_by_id[title] = len(ids)
+            ids.append(sys.intern(title))
+            body = node if isinstance(node, dict) else {}
+            descriptions.append(body.get("description") or "")
+            return index_by_id[title], True
+
+        stack = []
+        for title, node in reversed(list(tree.items())):
+            stack.append((visit(title, node)[0], node))
+        while stack:
+            parent, node = stack.pop()
+            specializations = (node or {}).get("specializations") or {}
+            children = []
+            for title, child in specializations.items():
+                index, is_new = visit(title, child)
+                edges.append((parent, index, DEFAULT_COLLECTION))
+                if is_new:
+                    children.append((index, child))
+            stack.extend(reversed(children))
+
+        root = 0 if len(tree) == 1 else None
+        return cls(ids, list(ids), descriptions, edges, root)
+
+    @classmethod
+    def from_file(cls, path: str) -> "OntologyGraph":
+        return cls.from_snapshot(load_snapshot(path))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.child_index)
+
+    def index(self, node_id: str) -> int:
+        """Index of `node_id`; KeyError if the snapshot has no such node."""
+        return self.index_by_id[node_id]
+
+    def indices_of_title(self, title: str) -> list[int]:
+        """Indices of the nodes titled `title` (titles are not unique)."""
+        if self._indices_by_title is None:
+            self._indices_by_title = {}
+            for i, node_title in enumerate(self.titles):
+                self._indices_by_title.setdefault(node_title, []).append(i)
+        return self._indices_by_title.get(title, [])
+
+    def children(self, node: int) -> array:
+        return self.child_index[self.child_offsets[node] : self.child_offsets[node + 1]]
+
+    def parents(self, node: int) -> array:
+        start, end = self.parent_offsets[node], self.parent_offsets[node + 1]
+        return self.parent_index[start:end]
+
+    def child_collections(self, node: int) -> dict[str, list[int]]:
+        """Children of `node` grouped by collection name, in snapshot order."""
+        grouped: dict[str, list[int]] = {}
+        for position in range(self.child_offsets[node], self.child_offsets[node + 1]):
+            name = self.collection_names[self.child_collection[position]]
+            grouped.setdefault(name, []).append(self.child_index[position])
+        return grouped
+
+    def roots(self) -> list[int]:
+        """Nodes without parents, in snapshot order."""
+        offsets = self.parent_offsets
+        return [i for i in range(len(self.ids)) if offsets[i] == offsets[i + 1]]
+
+    def _adjacency(self, reverse: bool) -> tuple[array, array]:
+        if reverse:
+            return self.parent_offsets, self.parent_index
+        return self.child_offsets, self.child_index
+
+    def bfs(
+        self,
+        starts: int | Iterable[int],
+        reverse: bool = False,
+        max_depth: int | None = None,
+    ) -> Iterator[tuple[int, int]]:
+        """
+        `(node, depth)` in breadth-first order from `starts` (depth 0), along
+        child edges or, with `reverse`, parent edges. Each node is visited once.
+        """
+        offsets, targets = self._adjacency(reverse)
+        starts = [starts] if isinstance(starts, int) else list(starts)
+        seen = bytearray(len(self.ids))
+        queue: deque[tuple[int, int]] = deque()
+        for start in starts:
+            if not seen[start]:
+                seen[start] = 1
+                queue.append((start, 0))
+        while queue:
+            node, depth = queue.popleft()
+            yield node, depth
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for position in range(offsets[node], offsets[node + 1]):
+                target = targets[position]
+                if not seen[target]:
+                    seen[target] = 1
+                    queue.append((target, depth + 1))
+
+    def dfs(self, starts: int | Iterable[int], reverse: bool = False) -> Iterator[int]:
+        """Nodes in depth-first preorder (children in snapshot order), once each."""
+        offsets, targets = self._adjacency(reverse)
+        starts = [starts] if isinstance(starts, int) else list(starts)
+        seen = bytearray(len(self.ids))
+        stack = list(reversed(starts))
+        while stack:
+            node = stack.pop()
+            if seen[node]:
+                continue
+            seen[node] = 1
+            yield node
+            for position in range(offsets[node + 1] - 1, offsets[node] - 1, -1):
+                if not seen[targets[position]]:
+                    stack.append(targets[position])
+
+    def descendants(self, node: int) -> set[int]:
+        """Nodes below `node`, excluding `node` unless it is on a cycle."""
+        return {i for i, depth in self.bfs(self.children(node))}
+
+    def ancestors(self, node: int) -> set[int]:
+        """Nodes above `node`, excluding `node` unless it is on a cycle."""
+        return {i for i, depth in self.bfs(self.parents(node), reverse=True)}
+
+    def node(self, node: int) -> dict[str, Any]:
+        return {
+            "id": self.ids[node],
+            "title": self.titles[node],
+            "description": self.descriptions[node],
+        }
@@ -0,0 +1,127 @@
+"""
+Multi-item prompts: classify several items against one shared sub-ontology.
+
+Items whose retrieved sub-ontologies overlap heavily are clustered, the
+clusters' ontologies are merged into one union ontology, and a single prompt
+asks the model to classify every item of the cluster. The ontology text, by
+far the largest part of the prompt, is then paid for once per cluster instead
+of once per item. The prompt itself is built by `PromptBuilder.build_multi`.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Iterable
+
+
+def cluster_items(
+    node_sets: list[set[str]],
+    min_overlap: float = 0.6,
+    max_items: int = 8,
+    max_union_nodes: int | None = None,
+) -> list[list[int]]:
+    """
+    Greedily cluster item indexes by the Jaccard overlap between an item's node
+    set and the union node set of a cluster.
+
+    Each item joins the open cluster with the highest overlap if that overlap is
+    at least `min_overlap`, the cluster has fewer than `max_items` items and the
+    merged union stays within `max_union_nodes`; otherwise it starts a new
+    cluster. An inverted index from node to clusters keeps this close to linear
+    in the total number of retrieved nodes.
+    """
+    clusters: list[list[int]] = []
+    unions: list[set[str]] = []
+    clusters_by_node: dict[str, set[int]] = defaultdict(set)
+
+    for item_index, nodes in enumerate(node_sets):
+        shared: dict[int, int] = defaultdict(int)
+        for node in nodes:
+            for cluster_index in clusters_by_node.get(node, ()):
+                shared[cluster_index] += 1
+
+        best_index, best_overlap = -1, 0.0
+        for cluster_index, intersection in shared.items():
+            if len(clusters[cluster_index]) >= max_items:
+                continue
+            union_size = len(unions[cluster_index]) + len(nodes) - intersection
+            if max_union_nodes is not None and union_size > max_union_nodes:
+                continue
+            overlap = intersection / union_size if union_size else 0.0
+            if overlap > best_overlap:
+                best_index, best_overlap = cluster_index, overlap
+
+        if best_index == -1 or best_overlap < min_overlap:
+            best_index = len(clusters)
+            clusters.append([])
+            unions.append(set())
+        clusters[best_index].append(item_index)
+        unions[best_index] |= nodes
+        for node in nodes:
+            clusters_by_node[node].add(best_index)
+
+    return clusters
+
+
+def _merge_into(target: dict, source: dict) -> None:
+    if not target.get("description") and source.get("description"):
+        target["description"] = source["description"]
+    collections = target.setdefault("specializations", [])
+    by_name = {collection["collectionName"]: collection for collection in collections}
+    for source_collection in source.get("specializations") or []:
+        name = source_collection.get("collectionName", "default")
+        collection = by_name.get(name)
+        if collection is None:
+            collection = {"collectionName": name, "nodes": []}
+            collections.append(collection)
+            by_name[name] = collection
+        nodes_by_title = {node["title"]: node for node in collection["nodes"]}
+        for source_node in source_collection.get("nodes") or []:
+            node = nodes_by_title.get(source_node["title"])
+            if node is None:
+                node = {
+                    "title": source_node["title"],
+                    "description": source_node.get("description", ""),
+                    "specializations": [],
+                }
+                collection["nodes"].append(node)
+                nodes_by_title[node["title"]] = node
+            _merge_into(node, source_node)
+
+
+def merge_ontology_objects(ontology_objects: Iterable[Any]) -> dict:
+    """
+    Union of several nested sub-ontologies sharing the same root: nodes are
+    matched by title within each collection, first-seen order is kept.
+    """
+    merged: dict = {}
+    for ontology_object in ontology_objects:
+        if not ontology_object:
+            continue
+        if not merged:
+            merged = {
+                "title": ontology_object.get("title", ""),
+                "description": ontology_object.get("description", ""),
+                "specializations": [],
+            }
+        _merge_into(merged, ontology_object)
+    return merged
+
+
+def split_multi_item_response(response: Any, item_ids: list[str]) -> dict[str, dict]:
+    """
+    Map item ids to their per-item objects from a `{"results": [...]}` response.
+    Elements with an unknown or repeated id are dropped; ids missing from the
+    result are simply absent, so callers can retry those items on their own.
+    """
+    if not isinstance(response, dict) or not isinstance(response.get("results"), list):
+        return {}
+    expected = set(item_ids)
+    per_item: dict[str, dict] = {}
+    for element in response["results"]:
+        if not isinstance(element, dict):
+            continue
+        item_id = str(element.get("item_id", ""))
+        if item_id in expected and item_id not in per_item:
+            per_item[item_id] = {k: v for k, v in element.items() if k != "item_id"}
+    return per_item
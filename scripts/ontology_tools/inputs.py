@@ -0,0 +1,174 @@
+"""
+Streaming reader for input CSVs whose cells hold Python literals, such as the
+`raw_skill` column of the job-posting exports:
+
+    "[{'name': 'Student recruitment', 'description': '...'}, ...]"
+
+`read_literal_column` reads the file in chunks of rows and yields them in input
+order with the column parsed, so a multi-million-row dump is never held in
+memory. Parsing runs in a process pool when one is given (see
+`create_parse_pool`); only a few chunks are in flight at a time.
+
+`parse_literal` turns the cell into JSON and parses that with the C JSON
+decoder, which is several times faster than `ast.literal_eval` on these cells;
+anything it cannot convert still goes through `ast.literal_eval`.
+`count_literal_items` is a pre-scan that counts the skills without parsing, for
+progress and ETA.
+"""
+
+from __future__ import annotations
+
+import ast
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Iterator
+
+# Python literal tokens that differ from JSON: single-quoted strings without
+# escapes or double quotes (the common case, rewritten inline), other strings
+# and the constants. Strings are matched first, so nothing inside them is
+# touched.
+_LITERAL_TOKEN = re.compile(
+    r"""'([^'\\"]*)'|"[^"\\]*"|'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|"""
+    r"""\b(True|False|None)\b"""
+)
+_JSON_CONSTANTS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _json_token(match: re.Match) -> str:
+    simple, constant = match.groups()
+    if simple is not None:
+        return f'"{simple}"'
+    if constant is not None:
+        return _JSON_CONSTANTS[constant]
+    token = match.group(0)
+    if token[0] == '"' and "\\" not in token:
+        return token
+    return json.dumps(ast.literal_eval(token), ensure_ascii=False)
+
+
+def parse_literal(text: str) -> Any:
+    """Equivalent of `ast.literal_eval` for JSON-like literals, only faster."""
+    try:
+        return json.loads(_LITERAL_TOKEN.sub(_json_token, text))
+    except (ValueError, SyntaxError):
+        return ast.literal_eval(text)
+
+
+def parse_literal_cells(cells: list[str]) -> list[tuple[Any, str | None]]:
+    """`(value, error)` for every cell; a cell that fails yields `(None, error)`."""
+    parsed = []
+    for cell in cells:
+        try:
+            parsed.append((parse_literal(cell), None))
+        except (ValueError, SyntaxError, TypeError, RecursionError) as e:
+            parsed.append((None, f"{type(e).__name__}: {e}"))
+    return parsed
+
+
+def create_parse_pool(processes: int) -> ProcessPoolExecutor | None:
+    """
+    Process pool for `read_literal_column` with `processes` workers (at most one
+    per available CPU), or None when that leaves fewer than 2 or where
+    processes cannot be forked.
+
+    The classification scripts run at module level, and spawned workers would
+    import (and so run) them again, so only the "fork" start method is used.
+    The workers are started right away: create the pool before any threads, as
+    forking a multi-threaded process is unsafe.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        processes = min(processes, len(os.sched_getaffinity(0)))
+    else:
+        processes = min(processes, os.cpu_count() or 1)
+    if processes < 2 or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    pool = ProcessPoolExecutor(
+        processes, mp_context=multiprocessing.get_context("fork")
+    )
+    pool.submit(parse_literal_cells, []).result()
+    return pool
+
+
+def _allow_large_fields() -> None:
+    limit = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(limit)
+            return
+        except OverflowError:
+            limit //= 10
+
+
+def count_literal_items(path: str, column: str, key: str = "name") -> int:
+    """
+    Number of dicts in `column` over the whole file, counted by their `key`
+    entries with a regex instead of parsing them.
+    """
+    _allow_large_fields()
+    pattern = re.compile(rf"""['"]{re.escape(key)}['"]\s*:""")
+    count = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if column not in header:
+            return 0
+        position = header.index(column)
+        for row in reader:
+            if position < len(row):
+                count += len(pattern.findall(row[position]))
+    return count
+
+
+def read_literal_column(
+    path: str,
+    column: str,
+    pool: ProcessPoolExecutor | None = None,
+    chunk_size: int = 256,
+    max_pending_chunks: int = 8,
+) -> Iterator[tuple[int, dict, Any]]:
+    """
+    Yield `(row_number, row, parsed)` for every row of the CSV at `path`, in
+    order, with `column` parsed by `parse_literal` (None, after logging, if it
+    cannot be parsed). Row numbers start at 1.
+    """
+    _allow_large_fields()
+    pending: deque[tuple[int, list[dict], Future | list]] = deque()
+
+    def finish(entry) -> Iterator[tuple[int, dict, Any]]:
+        first_row, rows, parsed = entry
+        if isinstance(parsed, Future):
+            parsed = parsed.result()
+        for offset, (row, (value, error)) in enumerate(zip(rows, parsed)):
+            if error is not None:
+                print({"error": f"row {first_row + offset}: {column}: {error}"})
+            yield first_row + offset, row, value
+
+    def submit(first_row: int, rows: list[dict]) -> None:
+        cells = [row.get(column) or "[]" for row in rows]
+        if pool is None:
+            pending.append((first_row, rows, parse_literal_cells(cells)))
+        else:
+            pending.append((first_row, rows, pool.submit(parse_literal_cells, cells)))
+
+    with open(path, newline="", encoding="utf-8") as f:
+        chunk: list[dict] = []
+        first_row = 1
+        for row in csv.DictReader(f):
+            chunk.append(row)
+            if len(chunk) < chunk_size:
+                continue
+            submit(first_row, chunk)
+            first_row += len(chunk)
+            chunk = []
+            while len(pending) >= max_pending_chunks or (pool is None and pending):
+                yield from finish(pending.popleft())
+        if chunk:
+            submit(first_row, chunk)
+    while pending:
+        yield from finish(pending.popleft())
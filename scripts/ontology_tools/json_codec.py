@@ -0,0 +1,132 @@
+"""
+JSON parsing and serialization for the scripts, on the fastest backend installed.
+
+`orjson` is used when it is installed and the standard library `json`
+otherwise; set `ONTOLOGY_TOOLS_JSON=json` to force the standard library. The
+result never depends on the backend: `dumps` returns exactly the text of
+`json.dumps` with the same arguments, and `loads` the same values as
+`json.loads`. orjson is only used where that holds:
+
+- dumping with `indent` None (compact separators only) or 2, the common
+  `indent=2, ensure_ascii=False` of the output files included; with
+  `ensure_ascii=True` only when the encoded text is ASCII without DEL (which
+  `json` escapes),
+- values of plain JSON types, with floats that both backends write without an
+  exponent (orjson writes `1e-5` where `json` writes `1e-05`),
+- parsing input without integers too large for orjson (which would make them
+  floats) and without NaN, Infinity or lone surrogates (which it rejects).
+
+Everything else goes through `json`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import IO, Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if os.environ.get("ONTOLOGY_TOOLS_JSON", "").lower() == "json":
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# Input with a run of 19 digits may hold integers orjson parses as floats where
+# `json` keeps an int (a run inside a string merely costs the fast path). Digits
+# are mapped to "0" so one bytes.find spots a run; a regex scan is much slower.
+_DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+_DIGIT_RUN = b"0" * 19
+_PLAIN_TYPES = (str, int, bool, type(None))
+
+
+def _orjson_can_encode(value: Any) -> bool:
+    """Whether orjson writes `value` exactly as `json` does (checked iteratively)."""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind is dict:
+            for key in item:
+                if type(key) is not str:
+                    return False
+            stack.extend(item.values())
+        elif kind is list:
+            stack.extend(item)
+        elif kind is float:
+            if not (item == 0 or 1e-4 <= abs(item) < 1e16):
+                return False
+        elif kind not in _PLAIN_TYPES:
+            return False
+    return True
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        if raw.translate(_DIGITS_TO_ZERO).find(_DIGIT_RUN) < 0:
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass
+    return json.loads(data)
+
+
+def load(f: IO) -> Any:
+    return loads(f.read())
+
+
+def read_json(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dumps(
+    value: Any,
+    *,
+    indent: int | None = None,
+    ensure_ascii: bool = True,
+    separators: tuple[str, str] | None = None,
+    sort_keys: bool = False,
+    **kwargs: Any,
+) -> str:
+    """`json.dumps(value, ...)`; other keyword arguments always use `json`."""
+    if orjson is not None and not kwargs:
+        if indent == 2 and separators in (None, (",", ": ")):
+            option = orjson.OPT_INDENT_2
+        elif indent is None and separators == (",", ":"):
+            option = 0
+        else:
+            option = None
+        if option is not None and _orjson_can_encode(value):
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            try:
+                encoded = orjson.dumps(value, option=option)
+            except (TypeError, orjson.JSONEncodeError):
+                encoded = None
+            # `json` escapes DEL with ensure_ascii; orjson writes it as is
+            if encoded is not None and (
+                not ensure_ascii or (encoded.isascii() and b"\x7f" not in encoded)
+            ):
+                return encoded.decode("utf-8")
+    return json.dumps(
+        value,
+        indent=indent,
+        ensure_ascii=ensure_ascii,
+        separators=separators,
+        sort_keys=sort_keys,
+        **kwargs,
+    )
+
+
+def dump(value: Any, f: IO[str], **kwargs: Any) -> None:
+    f.write(dumps(value, **kwargs))
+
+
+def write_json(path: str, value: Any, **kwargs: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        dump(value, f, **kwargs)
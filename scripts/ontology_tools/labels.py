@@ -0,0 +1,65 @@
+"""
+Label normalization shared by the hierarchy comparison and title resolution.
+
+`normalize_label` reduces an ontology label to the part that identifies the
+concept, ignoring differences that are purely formatting:
+
+- "(Synonyms: ...)" suffixes,
+- "(Develop.v.01, ...)" style verb-sense lists,
+- trailing "(1)", "(2)", ... added to disambiguate duplicate titles,
+- runs of whitespace.
+"""
+
+from __future__ import annotations
+
+import re
+
+PAREN_RE = re.compile(r"\s*\(([^()]*)\)")
+VERB_SENSE_RE = re.compile(r"\b[^\s,()]+\.v\.\d+[A-Za-z0-9]*\b")
+# Duplicate-title disambiguation: "Foo (1)" vs "Foo". Use 1–3 digits so "(2024)" is not stripped.
+DUP_TITLE_SUFFIX_RE = re.compile(r"\s*\(\d{1,3}\)\s*$")
+
+
+def normalize_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+
+def strip_non_substantive_parenthetical(label: str) -> str:
+    """
+    Remove parenthetical chunks that are purely formatting differences:
+    - Synonym lists, e.g. "(Synonyms: ...)"
+    - Verb sense lists, e.g. "(Develop.v.01, Generate.v.01)"
+    """
+
+    def replace(match: re.Match[str]) -> str:
+        inner = normalize_whitespace(match.group(1))
+        lowered = inner.lower()
+        if lowered.startswith("synonyms:"):
+            return ""
+        if VERB_SENSE_RE.search(inner):
+            return ""
+        return match.group(0)
+
+    return PAREN_RE.sub(replace, label)
+
+
+def strip_duplicate_title_suffixes(label: str) -> str:
+    """
+    Remove trailing (n) suffixes added to differentiate duplicate node titles,
+    e.g. "Some concept (1)" -> "Some concept". Applied after synonym/verb-sense stripping.
+    Only 1–3 digit indices (avoids treating years like (2024) as duplicate tags).
+    """
+    s = label.strip()
+    while True:
+        m = DUP_TITLE_SUFFIX_RE.search(s)
+        if not m:
+            break
+        s = s[: m.start()].rstrip()
+    return s
+
+
+def normalize_label(label: str) -> str:
+    label = strip_non_substantive_parenthetical(label)
+    label = strip_duplicate_title_suffixes(label)
+    label = normalize_whitespace(label.strip())
+    return label
@@ -0,0 +1,336 @@
+"""
+Chat-completion calls shared by the classification scripts.
+
+Every call is turned into the same result dictionary:
+
+    {
+      "responseObject": parsed JSON object from the completion (or None),
+      "parseStatus": "ok", "repaired" or "failed" (see ontology_tools.responses),
+      "usedTokens": {"input", "output", "thinking", "total"},
+      "cost": {"inputCost", "outputCost", "totalCost", "currency"},
+      "executionTime": how long the call took, in milliseconds,
+      "model", "reasoningEffort": what answered, when known,
+    }
+
+`ChatModel.complete` makes one synchronous call through a `RequestScheduler`.
+With `stream=True` the completion is streamed and reading stops as soon as a
+JSON object with the required keys has closed, so trailing prose is neither
+waited for nor paid for; the result then also carries "streaming" timings
+(time to first token, time to the valid object, whether it stopped early).
+An early-stopped stream reports no usage, so its tokens and cost are unknown
+("usageReported" is False) and the request is charged its reservation.
+`result_from_batch_body` builds the same dictionary from a Batch API output
+body, so both paths are validated and written the same way.
+"""
+
+from __future__ import annotations
+
+import time
+from functools import partial
+from typing import Any, Callable, Iterable
+
+from .batch import completion_text, completion_usage
+from .prompts import estimate_tokens
+from .responses import ObjectScanner, missing_keys, parse_response
+from .scheduler import RequestScheduler
+
+# Example pricing per 1K tokens — adjust as needed for actual rates
+INPUT_COST_PER_1K = 0.00125
+OUTPUT_COST_PER_1K = 0.01
+
+# (input, output) price per 1K tokens of other models, matched by prefix of the
+# model name (the API reports dated names such as "gpt-5-mini-2025-08-07").
+# Models not listed here are priced at the rates above.
+MODEL_PRICES_PER_1K = {
+    "gpt-5-mini": (0.00025, 0.002),
+    "gpt-5-nano": (0.00005, 0.0004),
+}
+
+
+def model_prices(model: str | None) -> tuple[float, float]:
+    """(input, output) price per 1K tokens for `model`."""
+    matches = [name for name in MODEL_PRICES_PER_1K if (model or "").startswith(name)]
+    if not matches:
+        return INPUT_COST_PER_1K, OUTPUT_COST_PER_1K
+    return MODEL_PRICES_PER_1K[max(matches, key=len)]
+
+
+def estimate_cost(
+    prompt_tokens: int,
+    completion_tokens: int,
+    reasoning_tokens: int,
+    price_multiplier: float = 1.0,
+    model: str | None = None,
+) -> dict:
+    """Estimated cost in USD; `price_multiplier` is e.g. 0.5 for Batch API requests."""
+    input_price, output_price = model_prices(model)
+    input_cost_per_1k = input_price * price_multiplier
+    output_cost_per_1k = output_price * price_multiplier
+    input_cost = (prompt_tokens / 1000) * input_cost_per_1k
+    # Reasoning tokens are billed as output and are already included in
+    # completion_tokens, so they are not added a second time.
+    output_cost = (completion_tokens / 1000) * output_cost_per_1k
+    total_cost = input_cost + output_cost
+    return {
+        "inputCost": f"{input_cost:.6f}",
+        "outputCost": f"{output_cost:.6f}",
+        "totalCost": f"{total_cost:.6f}",
+        "currency": "USD",
+    }
+
+
+def build_result(
+    text: str,
+    usage: dict[str, int],
+    execution_time: Any,
+    price_multiplier: float = 1.0,
+    required_keys: Iterable[str] | None = None,
+    streaming: dict | None = None,
+    model: str | None = None,
+    reasoning_effort: str | None = None,
+) -> dict:
+    """
+    Packs completion text and usage (see `batch.completion_usage`) into a
+    result. The text is parsed preferring an object with `required_keys`;
+    `model` selects the pricing and, like `reasoning_effort`, is recorded.
+    """
+    response_object, parse_status = parse_response(text, required_keys)
+    result = {
+        "responseObject": response_object,
+        "parseStatus": parse_status,
+        "usedTokens": {
+            "input": usage["prompt_tokens"],
+            "output": usage["completion_tokens"],
+            "thinking": usage["reasoning_tokens"],
+            "total": usage["total_tokens"],
+        },
+        "cost": estimate_cost(
+            usage["prompt_tokens"],
+            usage["completion_tokens"],
+            usage["reasoning_tokens"],
+            price_multiplier,
+            model,
+        ),
+        "executionTime": execution_time,
+    }
+    if model is not None:
+        result["model"] = model
+    if reasoning_effort is not None:
+        result["reasoningEffort"] = reasoning_effort
+    if streaming is not None:
+        result["streaming"] = streaming
+    return result
+
+
+def failed_result() -> dict:
+    """Result returned when a call fails; it has no 'responseObject' key."""
+    return {
+        "content": "",
+        "usage": None,
+        "cost": {
+            "inputCost": "0",
+            "outputCost": "0",
+            "totalCost": "0",
+            "currency": "USD",
+        },
+        "executionTime": 0,
+    }
+
+
+def result_from_batch_body(
+    body: dict,
+    price_multiplier: float = 1.0,
+    required_keys: Iterable[str] | None = None,
+) -> dict:
+    """Converts one Batch API completion body into a result dictionary."""
+    return build_result(
+        completion_text(body),
+        completion_usage(body),
+        0,
+        price_multiplier,
+        required_keys,
+        model=body.get("model"),
+    )
+
+
+def used_tokens(body: dict) -> int | None:
+    """Total tokens of a completion body, None when its usage is unknown."""
+    return completion_usage(body)["total_tokens"] if body.get("usage") else None
+
+
+class ChatModel:
+    """
+    One chat model behind a `RequestScheduler`. Each request reserves its
+    prompt size plus `expected_output_tokens` of the tokens-per-minute quota.
+    Responses are parsed preferring an object with `required_keys`; with
+    `stream=True` they are streamed and cut off once such an object closes.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        scheduler: RequestScheduler,
+        model: str = "gpt-5",
+        reasoning_effort: str = "high",
+        expected_output_tokens: int = 4000,
+        required_keys: Iterable[str] | None = None,
+        stream: bool = False,
+    ) -> None:
+        self.client = client
+        self.scheduler = scheduler
+        self.model = model
+        self.reasoning_effort = reasoning_effort
+        self.expected_output_tokens = expected_output_tokens
+        self.required_keys = list(required_keys or [])
+        self.stream = stream
+
+    def _create(self, prompt: str, reasoning_effort: str, **kwargs: Any) -> Any:
+        return self.client.chat.completions.create(
+            model=self.model,
+            reasoning_effort=reasoning_effort,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs,
+        )
+
+    def _request(self, prompt: str, reasoning_effort: str) -> dict:
+        completion = self._create(prompt, reasoning_effort)
+        if hasattr(completion, "model_dump"):
+            return completion.model_dump()
+        return completion
+
+    def _stream(
+        self, prompt: str, reasoning_effort: str, required_keys: list[str]
+    ) -> dict:
+        """
+        Streams one completion and returns it as a completion body, with the
+        timings under "streaming". Stops at the first closed object that has
+        every required key and closes the stream.
+        """
+        started = time.perf_counter()
+        stream = self._create(
+            prompt,
+            reasoning_effort,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        scanner = ObjectScanner()
+        parts: list[str] = []
+        usage = None
+        first_token = valid_object = None
+        stopped_early = False
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage.model_dump()
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if not delta:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                parts.append(delta)
+                spans = scanner.feed(delta)
+                text = "".join(parts) if spans else ""
+                for start, end in spans:
+                    obj, _ = parse_response(text[start:end], required_keys)
+                    if obj is not None and not missing_keys(obj, required_keys):
+                        valid_object = time.perf_counter() - started
+                        break
+                if valid_object is not None:
+                    stopped_early = True
+                    break
+        finally:
+            close = getattr(stream, "close", None)
+            if stopped_early and close:
+                close()
+
+        # The API reports usage only in the final chunk, so an early-stopped
+        # stream has none. It is left unreported rather than estimated from the
+        # visible text (which misses the reasoning tokens): the scheduler then
+        # keeps the pre-call reservation (prompt plus `expected_output_tokens`)
+        # as the quota charge, and telemetry counts the request as unreported.
+        return {
+            "choices": [{"message": {"content": "".join(parts)}}],
+            "usage": usage,
+            "streaming": {
+                "timeToFirstToken": first_token,
+                "timeToValidObject": valid_object,
+                "stoppedEarly": stopped_early,
+                "usageReported": usage is not None,
+            },
+        }
+
+    def complete(
+        self,
+        prompt: str,
+        reasoning_effort: str | None = None,
+        required_keys: Iterable[str] | None = None,
+    ) -> dict:
+        """
+        Sends `prompt` and returns the result dictionary, or `failed_result()`
+        once the scheduler has given up on rate-limit and transient errors.
+        `required_keys` overrides the model's default for this prompt.
+        """
+        effort = reasoning_effort or self.reasoning_effort
+        keys = self.required_keys if required_keys is None else list(required_keys)
+        try:
+            start_time = time.perf_counter()
+            if self.stream:
+                request = partial(self._stream, prompt, effort, keys)
+            else:
+                request = partial(self._request, prompt, effort)
+            body = self.scheduler.call(
+                request,
+                estimated_tokens=estimate_tokens(prompt)
+                + self.expected_output_tokens,
+                actual_tokens=used_tokens,
+            )
+            execution_time = int((time.perf_counter() - start_time) * 1000)
+
+            return build_result(
+                completion_text(body),
+                completion_usage(body),
+                execution_time,
+                required_keys=keys,
+                streaming=body.get("streaming"),
+                model=self.model,
+                reasoning_effort=effort,
+            )
+
+        except Exception as e:
+            print({"error": str(e)})
+            return failed_result()
+
+    def complete_valid(
+        self,
+        prompt: str,
+        validate: Callable[[dict], Any],
+        retries: int = 3,
+        first_result: dict | None = None,
+        results: list | None = None,
+    ) -> Any:
+        """
+        Returns `validate(result)` for the first result it accepts (anything
+        truthy), trying up to `retries` results in total. `first_result`, when
+        given, counts as the first attempt. Every result obtained here is
+        appended to `results` when a list is given (for telemetry). Returns
+        None when the request itself fails or every attempt is invalid.
+        """
+        result = first_result
+        for _ in range(retries):
+            if result is None:
+                result = self.complete(prompt)
+                if results is not None:
+                    results.append(result)
+            if "responseObject" not in result:
+                # The request itself failed (already logged)
+                return None
+            validated = validate(result)
+            if validated:
+                return validated
+            print("Invalid response detected — retrying...")
+            result = None
+
+        print("Failed to get valid response after retries.")
+        return None
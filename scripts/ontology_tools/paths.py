@@ -0,0 +1,90 @@
+"""
+Root-to-node paths of ontology nodes, computed locally.
+
+A `PathIndex` maps every title to the titles of its parents, built either from
+a nested sub-ontology (`ontology_object`) or from a snapshot's `edges`, and
+enumerates all paths from the root to a title:
+
+    "Act > Act on what? > Act on information (“Think”) > Create information"
+
+The sub-ontology returned by `load-sub-ontology` holds every ancestor of its
+nodes, so it has all paths to any node it contains; a snapshot also resolves
+titles outside it. Paths are memoized per title, so repeated lookups cost a
+dictionary access.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Tuple
+
+from .graph import OntologyGraph
+from .snapshot import Snapshot
+
+PATH_SEPARATOR = " > "
+
+Path = Tuple[str, ...]
+
+
+class PathIndex:
+    def __init__(self, parents: dict[str, list[str]]) -> None:
+        self.parents = parents
+        self._paths: dict[str, list[Path]] = {}
+
+    @classmethod
+    def from_ontology_object(cls, ontology_object: Any) -> "PathIndex":
+        parents: dict[str, list[str]] = {}
+        if not ontology_object:
+            return cls(parents)
+        parents.setdefault(ontology_object.get("title", ""), [])
+        stack = [ontology_object]
+        while stack:
+            node = stack.pop()
+            title = node.get("title", "")
+            for collection in node.get("specializations") or []:
+                for child in collection.get("nodes") or []:
+                    child_parents = parents.setdefault(child.get("title", ""), [])
+                    if title not in child_parents:
+                        child_parents.append(title)
+                        stack.append(child)
+        return cls(parents)
+
+    @classmethod
+    def from_graph(cls, graph: OntologyGraph) -> "PathIndex":
+        parents: dict[str, list[str]] = {title: [] for title in graph.titles}
+        for node, title in enumerate(graph.titles):
+            for parent in graph.parents(node):
+                parent_title = graph.titles[parent]
+                if parent_title not in parents[title]:
+                    parents[title].append(parent_title)
+        return cls(parents)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "PathIndex":
+        return cls.from_graph(OntologyGraph.from_snapshot(snapshot))
+
+    def paths_to(self, title: str) -> list[Path]:
+        """Every path from a root to `title`, root first; [] for unknown titles."""
+        if title not in self.parents:
+            return []
+        return self._paths_to(title, frozenset())
+
+    def _paths_to(self, title: str, visiting: frozenset[str]) -> list[Path]:
+        cached = self._paths.get(title)
+        if cached is not None:
+            return cached
+        parents = [p for p in self.parents.get(title, []) if p not in visiting]
+        if not self.parents.get(title):
+            paths = [(title,)]
+        else:
+            paths = [
+                path + (title,)
+                for parent in parents
+                for path in self._paths_to(parent, visiting | {title})
+            ]
+        # Paths computed while skipping a parent on a cycle are incomplete
+        if len(parents) == len(self.parents.get(title, [])):
+            self._paths[title] = paths
+        return paths
+
+    def formatted_paths(self, title: str, separator: str = PATH_SEPARATOR) -> list[str]:
+        return [separator.join(path) for path in self.paths_to(title)]
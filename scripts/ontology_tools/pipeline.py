@@ -0,0 +1,194 @@
+"""
+Staged producer/consumer pipeline for the classification scripts.
+
+A run is a chain of stages connected by bounded queues:
+
+    source (reader) -> retrieval -> pruning -> prompt -> llm -> validation -> sink
+
+Each `Stage` has its own number of worker threads, so a slow stage (the model
+call) overlaps with fast ones (retrieval, prompt building) instead of every
+item passing through all of them strictly in sequence. Bounded queues keep
+memory flat: a stage that falls behind makes the stages before it wait. In
+ordered mode the reader also waits while as many items as the queues and
+workers can hold are read but not yet passed to the sink, so items finished
+ahead of a stalled one cannot pile up without bound.
+
+Items flow as `WorkItem`s. A stage function receives the item's `data` dict
+and updates it in place. If it raises, the error is logged and recorded on the
+item, later stages skip it, and the sink still receives it so the failure can
+be reported. The sink runs on the calling thread and, by default, receives
+items in input order.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+_DONE = object()
+
+
+@dataclass
+class WorkItem:
+    index: int
+    data: dict
+    error: str | None = None
+    # Seconds spent in each stage, by stage name
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[dict], Any]
+    workers: int = 1
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage], queue_size: int = 32) -> None:
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = {
+            stage.name: {"items": 0, "errors": 0, "seconds": 0.0} for stage in stages
+        }
+        self._lock = threading.Lock()
+
+    def _read(
+        self,
+        source: Iterable[dict],
+        out: queue.Queue,
+        errors: list[BaseException],
+        slots: threading.Semaphore | None,
+    ) -> None:
+        try:
+            for index, data in enumerate(source):
+                if slots is not None:
+                    slots.acquire()
+                out.put(WorkItem(index, data))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            for _ in range(self.stages[0].workers):
+                out.put(_DONE)
+
+    def _work(
+        self,
+        stage: Stage,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        next_workers: int,
+        finished: list[int],
+    ) -> None:
+        stats = self.stats[stage.name]
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if item.error is None:
+                started = time.perf_counter()
+                try:
+                    stage.fn(item.data)
+                except Exception as e:
+                    print({"error": f"{stage.name}: {e}"})
+                    item.error = f"{stage.name}: {e}"
+                elapsed = time.perf_counter() - started
+                item.timings[stage.name] = elapsed
+                with self._lock:
+                    stats["items"] += 1
+                    stats["seconds"] += elapsed
+                    if item.error is not None:
+                        stats["errors"] += 1
+            outbox.put(item)
+
+        # The last worker of a stage to finish tells the next stage to stop
+        with self._lock:
+            finished[0] += 1
+            last = finished[0] == stage.workers
+        if last:
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    def run(
+        self,
+        source: Iterable[dict],
+        sink: Callable[[WorkItem], Any],
+        ordered: bool = True,
+    ) -> dict:
+        """
+        Push every dict from `source` through the stages into `sink` and return
+        per-stage stats: items processed, errors and busy seconds (summed over
+        the stage's workers). Errors raised by `source` or `sink` stop the run
+        and are re-raised.
+        """
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        source_errors: list[BaseException] = []
+        # Items read but not yet sunk, in ordered mode: what the queues and
+        # workers can hold, so the reorder buffer is bounded by the same amount
+        slots = None
+        if ordered:
+            slots = threading.Semaphore(
+                self.queue_size * len(queues)
+                + sum(stage.workers for stage in self.stages)
+            )
+        threads = [
+            threading.Thread(
+                target=self._read,
+                args=(source, queues[0], source_errors, slots),
+                daemon=True,
+            )
+        ]
+        for position, stage in enumerate(self.stages):
+            next_workers = (
+                self.stages[position + 1].workers
+                if position + 1 < len(self.stages)
+                else 1
+            )
+            finished = [0]
+            for _ in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(
+                            stage,
+                            queues[position],
+                            queues[position + 1],
+                            next_workers,
+                            finished,
+                        ),
+                        daemon=True,
+                    )
+                )
+        for thread in threads:
+            thread.start()
+
+        # Items can finish out of order when a stage has several workers;
+        # hold them back until their turn when `ordered` is set. Each item
+        # sunk lets the reader take another one.
+        pending: dict[int, WorkItem] = {}
+        next_index = 0
+        final = queues[-1]
+        while True:
+            item = final.get()
+            if item is _DONE:
+                break
+            if not ordered:
+                sink(item)
+                continue
+            pending[item.index] = item
+            while next_index in pending:
+                sink(pending.pop(next_index))
+                slots.release()
+                next_index += 1
+        for index in sorted(pending):
+            sink(pending[index])
+
+        for thread in threads:
+            thread.join()
+        if source_errors:
+            raise source_errors[0]
+        return self.stats
@@ -0,0 +1,233 @@
+"""
+Prompt building for the classification scripts.
+
+Prompts are laid out so the part shared by every call comes first and the part
+that changes per item comes last:
+
+    <static instructions: role, ontology definition, output schema, rules>
+    ## Ontology Nodes:
+    <sub-ontology for this item>
+    ## Input:
+    <item fields>
+
+Keeping the long instructions as an identical prefix lets the provider's prompt
+cache reuse them across calls. The ontology itself can be serialized as:
+
+- "pretty":  `json.dumps(indent=2)`, the historical format (baseline).
+- "json":    minified JSON, same content without whitespace.
+- "outline": an indented title outline, one node per line, which drops the
+             repeated JSON keys entirely.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from . import json_codec
+
+ONTOLOGY_FORMATS = ("pretty", "json", "outline")
+
+JSON_ONTOLOGY_DEFINITION = """## Ontology Definition:
+Each node in our ontology represents a type of action and has these properties:
+- **title** (String) – a unique, concise title.
+- **description** (String) – a detailed explanation of the node, its purpose, scope, and context.
+- **specializations** (Array of Objects) – collections of more specific types of this node, organized along common dimensions. Each collection contains:
+  - **collectionName** (String) – the dimension along which specializations vary.
+  - **nodes** (Array of String) – titles of nodes that are specializations along this dimension."""
+
+OUTLINE_ONTOLOGY_DEFINITION = """## Ontology Definition:
+Each node in our ontology represents a type of action. The ontology is given as an indented outline with one node per line, written as "title — description":
+- **title** – a unique, concise title.
+- **description** – a detailed explanation of the node, its purpose, scope, and context (omitted when empty).
+- Lines indented under a node are its specializations (more specific types of that node).
+- A line in square brackets, e.g. "[Act on what?]", names a collection: the dimension along which the specializations indented beneath it vary. Specializations not under a bracketed line belong to the default collection."""
+
+# Appended to the static instructions of prompts that classify several items
+# at once against one shared ontology (see ontology_tools.grouping).
+MULTI_ITEM_INSTRUCTIONS = """## Multiple Inputs:
+The "Input" section contains several items, each introduced by a line "### item_id: <id>". Classify every item independently against the same ontology, as if it were the only input.
+Return a single JSON object only (no prose) of the form {"results": [...]}, with exactly one element per item, in the order given. Each element is the JSON object described in the "Output" section plus an "item_id" key holding the item's id."""
+
+OUTLINE_INDENT = "  "
+
+_tiktoken_encoding: Any = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken when it is installed, otherwise fall back to the
+    usual ~4 characters per token approximation.
+    """
+    global _tiktoken_encoding
+    if _tiktoken_encoding is None:
+        try:
+            import tiktoken
+
+            _tiktoken_encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _tiktoken_encoding = False
+    if _tiktoken_encoding:
+        return len(_tiktoken_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _single_line(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def _outline_lines(node: dict, depth: int, lines: list[str]) -> None:
+    title = node.get("title", "")
+    description = _single_line(node.get("description", ""))
+    line = f"{title} — {description}" if description else title
+    lines.append(f"{OUTLINE_INDENT * depth}{line}")
+    for collection in node.get("specializations") or []:
+        child_depth = depth + 1
+        name = collection.get("collectionName", "default")
+        nodes = collection.get("nodes") or []
+        if not nodes:
+            continue
+        if name not in ("default", "main"):
+            lines.append(f"{OUTLINE_INDENT * child_depth}[{name}]")
+            child_depth += 1
+        for child in nodes:
+            _outline_lines(child, child_depth, lines)
+
+
+def serialize_ontology(ontology_object: Any, ontology_format: str = "json") -> str:
+    if ontology_format == "pretty":
+        return json_codec.dumps(ontology_object, indent=2)
+    if ontology_format == "json":
+        return json_codec.dumps(
+            ontology_object, ensure_ascii=False, separators=(",", ":")
+        )
+    if ontology_format == "outline":
+        if not ontology_object:
+            return "(no ontology nodes)"
+        lines: list[str] = []
+        _outline_lines(ontology_object, 0, lines)
+        return "\n".join(lines)
+    raise ValueError(f"Unknown ontology format: {ontology_format!r}")
+
+
+def ontology_definition(ontology_format: str) -> str:
+    if ontology_format == "outline":
+        return OUTLINE_ONTOLOGY_DEFINITION
+    return JSON_ONTOLOGY_DEFINITION
+
+
+class PromptBuilder:
+    """
+    Assembles prompts from a static instruction template and per-item data.
+
+    `instructions` may contain `{ontology_definition}`, which is filled with the
+    definition matching `ontology_format`; no other placeholders are expanded, so
+    literal JSON braces in the template are left alone.
+
+    With `compare_baseline`, every report also counts the tokens of the same
+    prompt in the historical pretty-printed layout. That serializes and counts
+    a second, larger prompt per build, so it is off unless asked for.
+    """
+
+    def __init__(
+        self,
+        instructions: str,
+        ontology_format: str = "json",
+        compare_baseline: bool = False,
+    ) -> None:
+        if ontology_format not in ONTOLOGY_FORMATS:
+            raise ValueError(f"Unknown ontology format: {ontology_format!r}")
+        self.ontology_format = ontology_format
+        self.compare_baseline = compare_baseline
+        self.static_prefix = instructions.strip().replace(
+            "{ontology_definition}", ontology_definition(ontology_format)
+        )
+        self._baseline_prefix = instructions.strip().replace(
+            "{ontology_definition}", JSON_ONTOLOGY_DEFINITION
+        )
+        self.static_prefix_tokens = estimate_tokens(self.static_prefix)
+
+    def _assemble(self, prefix: str, ontology_text: str, item_section: str) -> str:
+        return (
+            f"{prefix}\n\n## Ontology Nodes:\n{ontology_text}\n\n"
+            f"## Input:\n{item_section.strip()}\n"
+        )
+
+    def _baseline_tokens(self, ontology_object: Any, item_section: str) -> int:
+        return estimate_tokens(
+            self._assemble(
+                self._baseline_prefix,
+                serialize_ontology(ontology_object, "pretty"),
+                item_section,
+            )
+        )
+
+    def _report(
+        self, prompt: str, baseline_tokens: Callable[[], int], **extra: Any
+    ) -> dict:
+        prompt_tokens = estimate_tokens(prompt)
+        report: dict[str, Any] = {
+            "ontologyFormat": self.ontology_format,
+            "promptTokens": prompt_tokens,
+        }
+        if self.compare_baseline:
+            baseline = baseline_tokens()
+            saved = baseline - prompt_tokens
+            report["baselineTokens"] = baseline
+            report["savedTokens"] = saved
+            report["savedPercent"] = (
+                round(100 * saved / baseline, 1) if baseline else 0.0
+            )
+        report["staticPrefixTokens"] = self.static_prefix_tokens
+        report.update(extra)
+        return report
+
+    def build(self, ontology_object: Any, item_section: str) -> tuple[str, dict]:
+        """
+        Return `(prompt, report)`. With `compare_baseline` the report compares
+        the prompt against the same content with the historical pretty-printed
+        JSON ontology.
+        """
+        prompt = self._assemble(
+            self.static_prefix,
+            serialize_ontology(ontology_object, self.ontology_format),
+            item_section,
+        )
+        return prompt, self._report(
+            prompt, lambda: self._baseline_tokens(ontology_object, item_section)
+        )
+
+    def build_multi(
+        self,
+        ontology_object: Any,
+        item_sections: list[tuple[str, str]],
+        item_ontology_objects: list[Any] | None = None,
+    ) -> tuple[str, dict]:
+        """
+        Build one prompt classifying several `(item_id, item_section)` items
+        against a shared `ontology_object`. When the items' own sub-ontologies
+        are given, the report's baseline (with `compare_baseline`) is the cost
+        of one historical prompt per item; otherwise each item is assumed to use
+        the shared ontology.
+        """
+        input_section = "\n\n".join(
+            f"### item_id: {item_id}\n{section.strip()}"
+            for item_id, section in item_sections
+        )
+        prompt = self._assemble(
+            f"{self.static_prefix}\n\n{MULTI_ITEM_INSTRUCTIONS}",
+            serialize_ontology(ontology_object, self.ontology_format),
+            input_section,
+        )
+        per_item_ontologies = item_ontology_objects or [ontology_object] * len(
+            item_sections
+        )
+        return prompt, self._report(
+            prompt,
+            lambda: sum(
+                self._baseline_tokens(item_ontology, section)
+                for item_ontology, (_, section) in zip(
+                    per_item_ontologies, item_sections
+                )
+            ),
+            items=len(item_sections),
+        )
@@ -0,0 +1,213 @@
+"""
+Prune a retrieved sub-ontology to the neighbourhood of its search hits.
+
+`load-sub-ontology` returns both the nested `ontology_object` and the ranked
+`topResults` it was built from. With a large search limit the ontology is much
+bigger than what the model needs to decide; `prune_ontology` keeps, within a
+token budget and in this order of priority:
+
+1. every hit (by rank) with its ancestors up to the root,
+2. the hits' direct specializations,
+3. the hits' siblings,
+4. the hits' grandchildren.
+
+A node is only added together with all of its ancestors, so the pruned object
+is still a tree rooted at the same node. The ontology can contain the same
+title under several parents (multiple inheritance); each occurrence is handled
+separately, identified by its title path from the root.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any, Iterable, Tuple
+
+from .prompts import estimate_tokens
+
+PRUNE_MODES = ("off", "shadow", "on")
+
+# Rough per-node cost of the JSON keys and punctuation around title/description
+NODE_OVERHEAD_TOKENS = 8
+
+Path = Tuple[str, ...]
+
+
+class _OntologyIndex:
+    def __init__(self, ontology_object: dict) -> None:
+        self.nodes: dict[Path, dict] = {}
+        self.children: dict[Path, list[Path]] = {}
+        self.paths_by_title: dict[str, list[Path]] = {}
+        root_path = (ontology_object.get("title", ""),)
+        stack = [(root_path, ontology_object)]
+        while stack:
+            path, node = stack.pop()
+            if path in self.nodes:
+                continue
+            self.nodes[path] = node
+            self.paths_by_title.setdefault(node.get("title", ""), []).append(path)
+            child_paths = []
+            for collection in node.get("specializations") or []:
+                for child in collection.get("nodes") or []:
+                    child_path = path + (child.get("title", ""),)
+                    # A title repeated on its own path would be a cycle
+                    if child_path[-1] in path:
+                        continue
+                    child_paths.append(child_path)
+                    stack.append((child_path, child))
+            self.children[path] = child_paths
+        self.root = root_path
+
+    def cost(self, path: Path) -> int:
+        node = self.nodes[path]
+        text = f"{node.get('title', '')} {node.get('description', '')}"
+        return estimate_tokens(text) + NODE_OVERHEAD_TOKENS
+
+
+def _copy_kept(node: dict, path: Path, kept: set[Path]) -> dict:
+    pruned = {key: value for key, value in node.items() if key != "specializations"}
+    collections = []
+    for collection in node.get("specializations") or []:
+        nodes = [
+            _copy_kept(child, path + (child.get("title", ""),), kept)
+            for child in collection.get("nodes") or []
+            if path + (child.get("title", ""),) in kept
+        ]
+        if nodes:
+            collections.append({**collection, "nodes": nodes})
+    pruned["specializations"] = collections
+    return pruned
+
+
+def prune_ontology(
+    ontology_object: dict,
+    top_results: Iterable[dict],
+    token_budget: int = 3000,
+) -> tuple[dict, dict]:
+    """
+    Return `(pruned_object, stats)`. When none of `top_results` occurs in the
+    ontology the object is returned unchanged (a deep copy) with
+    `stats["pruned"] = False`.
+    """
+    if not ontology_object:
+        return ontology_object, {"pruned": False, "fullNodes": 0, "keptNodes": 0}
+
+    index = _OntologyIndex(ontology_object)
+    hit_titles: list[str] = []
+    for result in top_results or []:
+        title = result.get("title")
+        if title in index.paths_by_title and title not in hit_titles:
+            hit_titles.append(title)
+    full_tokens = sum(index.cost(path) for path in index.nodes)
+    stats = {
+        "pruned": False,
+        "fullNodes": len(index.nodes),
+        "keptNodes": len(index.nodes),
+        "hits": len(hit_titles),
+        "hitsKept": len(hit_titles),
+        "fullTokens": full_tokens,
+        "keptTokens": full_tokens,
+    }
+    if not hit_titles or full_tokens <= token_budget:
+        return copy.deepcopy(ontology_object), stats
+
+    kept: set[Path] = {index.root}
+    used = index.cost(index.root)
+
+    def add(path: Path) -> bool:
+        nonlocal used
+        missing = [path[:depth] for depth in range(1, len(path) + 1)]
+        missing = [prefix for prefix in missing if prefix not in kept]
+        cost = sum(index.cost(prefix) for prefix in missing)
+        if used + cost > token_budget:
+            return False
+        kept.update(missing)
+        used += cost
+        return True
+
+    hit_paths = [path for title in hit_titles for path in index.paths_by_title[title]]
+    for path in hit_paths:
+        add(path)
+    for path in hit_paths:
+        for child in index.children.get(path, []):
+            add(child)
+    for path in hit_paths:
+        for sibling in index.children.get(path[:-1], []) if len(path) > 1 else []:
+            add(sibling)
+    for path in hit_paths:
+        for child in index.children.get(path, []):
+            for grandchild in index.children.get(child, []):
+                add(grandchild)
+
+    kept_titles = {path[-1] for path in kept}
+    stats.update(
+        {
+            "pruned": True,
+            "keptNodes": len(kept),
+            "hitsKept": sum(1 for title in hit_titles if title in kept_titles),
+            "keptTokens": used,
+        }
+    )
+    return _copy_kept(ontology_object, index.root, kept), stats
+
+
+def ontology_titles(ontology_object: Any) -> set[str]:
+    """Titles of every node in a nested `ontology_object`."""
+    titles: set[str] = set()
+    stack = [ontology_object] if ontology_object else []
+    while stack:
+        node = stack.pop()
+        if node.get("title"):
+            titles.add(node["title"])
+        for collection in node.get("specializations") or []:
+            stack.extend(collection.get("nodes") or [])
+    return titles
+
+
+def prune_for_prompt(
+    ontology_object: dict,
+    top_results: Iterable[dict],
+    mode: str = "off",
+    token_budget: int = 3000,
+) -> tuple[dict, set[str] | None, dict | None]:
+    """
+    Return `(prompt_ontology, pruned_titles, stats)` for `mode`:
+
+    - "off": the ontology as retrieved; no titles or stats.
+    - "shadow": the ontology as retrieved, plus the titles and stats of the
+      pruned one, to measure coverage before pruning for real.
+    - "on": the pruned ontology, its titles and stats.
+    """
+    if mode not in PRUNE_MODES:
+        raise ValueError(
+            f"Unknown prune mode: {mode!r} (expected one of {PRUNE_MODES})"
+        )
+    if mode == "off":
+        return ontology_object, None, None
+    pruned, stats = prune_ontology(ontology_object, top_results, token_budget)
+    prompt_ontology = pruned if mode == "on" else ontology_object
+    return prompt_ontology, ontology_titles(pruned), stats
+
+
+def pruning_coverage(
+    stats: dict | None, pruned_titles: set[str] | None, chosen: str | None
+) -> dict | None:
+    """Pruning stats of one item plus whether its chosen node was kept."""
+    if stats is None:
+        return None
+    return {
+        **stats,
+        "chosenTitle": chosen,
+        "chosenInPruned": None if chosen is None else chosen in pruned_titles,
+    }
+
+
+def chosen_title(results: Iterable[dict]) -> str | None:
+    """Title of the node chosen in the last model result that names one."""
+    for result in reversed(list(results or [])):
+        response = result.get("responseObject") if result else None
+        if not isinstance(response, dict):
+            continue
+        node = response.get("most_appropriate_node")
+        if isinstance(node, dict) and node.get("title"):
+            return node["title"]
+    return None
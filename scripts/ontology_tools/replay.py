@@ -0,0 +1,433 @@
+"""
+Record and replay of the classification scripts' external calls.
+
+With `api_mode = "record"` every sub-ontology lookup and every chat completion
+is passed through to the real service and appended to a fixtures file (JSON
+lines). With `api_mode = "replay"` the same calls are answered from that file
+by local stand-ins, without network access or API credits, while a
+`SimulationProfile` adds configurable latency, server errors and 429s so the
+scheduler and pipeline behave as they would against the live API.
+
+Fixture lines:
+
+    {"kind": "sub-ontology", "key", "query", "searchLimit", "response": {...}}
+    {"kind": "completion", "key", "model", "body": {chat completion body}}
+
+Keys are hashes of the request (search query and limit; model, reasoning
+effort and prompt), so a replay answers exactly the requests that were
+recorded. `on_missing="any"` instead answers unknown requests with a recorded
+response picked deterministically from the key, which is enough for load tests
+after the prompt format changed.
+
+With `api_mode = "cache"` recorded requests are answered from the fixtures file
+and only the others go to the real services (and are recorded), so repeated
+runs over the same inputs, such as the accuracy benchmark's variants, pay for
+each distinct request once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from . import json_codec
+from .batch import completion_text
+
+API_MODES = ("live", "record", "replay", "cache")
+
+
+@dataclass
+class SimulationProfile:
+    # Model call latency: base seconds plus seconds per completion token,
+    # scaled by a uniform factor in [1 - jitter, 1 + jitter].
+    latency_seconds: float = 0.0
+    seconds_per_output_token: float = 0.0
+    latency_jitter: float = 0.25
+    # Sub-ontology lookup latency in seconds
+    retrieval_latency_seconds: float = 0.0
+    # Probability of a simulated 500 / 429 response per model call
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Calls beyond this many in flight get a 429, like an account limit
+    server_concurrency: int | None = None
+    seed: int = 0
+
+
+class SimulatedAPIError(Exception):
+    def __init__(
+        self, message: str, status_code: int, retry_after: float | None = None
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {}
+        if retry_after is not None:
+            headers["retry-after"] = str(retry_after)
+        self.response = SimpleNamespace(headers=headers)
+
+
+def request_key(*parts: Any) -> str:
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def completion_key(model: str, reasoning_effort: str, messages: list) -> str:
+    return request_key("completion", model, reasoning_effort, messages)
+
+
+def sub_ontology_key(search_query: str, search_limit: int) -> str:
+    return request_key("sub-ontology", search_query, search_limit)
+
+
+class FixtureWriter:
+    """Thread-safe appender of fixture lines."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class Fixtures:
+    """Recorded responses of one fixtures file, by kind and key."""
+
+    def __init__(
+        self, path: str, on_missing: str = "error", allow_missing_file: bool = False
+    ) -> None:
+        if on_missing not in ("error", "any"):
+            raise ValueError(f"Unknown on_missing policy: {on_missing!r}")
+        self.on_missing = on_missing
+        self.entries: dict[str, dict[str, dict]] = {
+            "completion": {},
+            "sub-ontology": {},
+        }
+        if not (allow_missing_file and not os.path.exists(path)):
+            with open(path, encoding="utf-8") as f:
+                for raw in f:
+                    if raw.strip():
+                        entry = json_codec.loads(raw)
+                        self.entries[entry["kind"]][entry["key"]] = entry
+        self._ordered = {
+            kind: list(by_key.values()) for kind, by_key in self.entries.items()
+        }
+
+    def get(self, kind: str, key: str) -> dict:
+        entry = self.entries[kind].get(key)
+        if entry is not None:
+            return entry
+        recorded = self._ordered[kind]
+        if self.on_missing == "any" and recorded:
+            return recorded[int(key, 16) % len(recorded)]
+        raise KeyError(f"No recorded {kind} response for request {key}")
+
+
+class RecordingRetriever:
+    def __init__(self, retriever: Any, writer: FixtureWriter) -> None:
+        self.retriever = retriever
+        self.writer = writer
+
+    def load_sub_ontology(self, search_query: str, search_limit: int = 100) -> dict:
+        response = self.retriever.load_sub_ontology(
+            search_query, search_limit=search_limit
+        )
+        self.writer.write(
+            {
+                "kind": "sub-ontology",
+                "key": sub_ontology_key(search_query, search_limit),
+                "query": search_query,
+                "searchLimit": search_limit,
+                "response": response,
+            }
+        )
+        return response
+
+
+class _RecordingCompletions:
+    def __init__(self, completions: Any, writer: FixtureWriter) -> None:
+        self.completions = completions
+        self.writer = writer
+
+    def create(self, **kwargs: Any) -> Any:
+        stream = kwargs.pop("stream", False)
+        kwargs.pop("stream_options", None)
+        # Streamed requests are recorded as one full completion and handed
+        # back to the caller as chunks.
+        completion = self.completions.create(**kwargs)
+        body = completion.model_dump()
+        self.writer.write(
+            {
+                "kind": "completion",
+                "key": completion_key(
+                    kwargs["model"],
+                    kwargs.get("reasoning_effort", ""),
+                    kwargs["messages"],
+                ),
+                "model": kwargs["model"],
+                "body": body,
+            }
+        )
+        return _stream_chunks(body, 0.0) if stream else completion
+
+
+class RecordingClient:
+    """Wraps an OpenAI client; chat completions are passed through and recorded."""
+
+    def __init__(self, client: Any, writer: FixtureWriter) -> None:
+        self.client = client
+        self.chat = SimpleNamespace(
+            completions=_RecordingCompletions(client.chat.completions, writer)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+class _Simulator:
+    def __init__(self, profile: SimulationProfile) -> None:
+        self.profile = profile
+        self._random = random.Random(profile.seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def uniform(self, low: float, high: float) -> float:
+        with self._lock:
+            return self._random.uniform(low, high)
+
+    def chance(self, probability: float) -> bool:
+        return probability > 0 and self.uniform(0, 1) < probability
+
+    def latency(self, output_tokens: int = 0) -> float:
+        p = self.profile
+        base = p.latency_seconds + output_tokens * p.seconds_per_output_token
+        return max(0.0, base * self.uniform(1 - p.latency_jitter, 1 + p.latency_jitter))
+
+    def enter(self) -> None:
+        with self._lock:
+            limit = self.profile.server_concurrency
+            if limit is not None and self.in_flight >= limit:
+                raise SimulatedAPIError("Simulated rate limit (concurrency)", 429)
+            self.in_flight += 1
+        if self.chance(self.profile.rate_limit_rate):
+            self.exit()
+            raise SimulatedAPIError("Simulated rate limit", 429)
+        if self.chance(self.profile.error_rate):
+            self.exit()
+            raise SimulatedAPIError("Simulated server error", 500)
+
+    def exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+class ReplayCompletion:
+    """Stand-in for a chat completion object: `model_dump()` and `usage`."""
+
+    def __init__(self, body: dict) -> None:
+        self.body = body
+        usage = body.get("usage") or {}
+        self.usage = SimpleNamespace(**usage)
+        self.choices = [
+            SimpleNamespace(message=SimpleNamespace(content=completion_text(body)))
+        ]
+
+    def model_dump(self) -> dict:
+        return json.loads(json.dumps(self.body))
+
+
+class _Usage(SimpleNamespace):
+    def model_dump(self) -> dict:
+        return dict(vars(self))
+
+
+def _stream_chunks(body: dict, chunk_delay: float, piece_size: int = 24):
+    text = completion_text(body)
+    for start in range(0, len(text), piece_size):
+        if chunk_delay:
+            time.sleep(chunk_delay)
+        delta = SimpleNamespace(content=text[start : start + piece_size])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+    yield SimpleNamespace(choices=[], usage=_Usage(**(body.get("usage") or {})))
+
+
+class _ReplayCompletions:
+    def __init__(self, fixtures: Fixtures, simulator: _Simulator) -> None:
+        self.fixtures = fixtures
+        self.simulator = simulator
+
+    def create(self, **kwargs: Any) -> Any:
+        key = completion_key(
+            kwargs["model"], kwargs.get("reasoning_effort", ""), kwargs["messages"]
+        )
+        entry = self.fixtures.get("completion", key)
+        body = entry["body"]
+        output_tokens = (body.get("usage") or {}).get("completion_tokens", 0)
+        latency = self.simulator.latency(output_tokens)
+
+        self.simulator.enter()
+        if not kwargs.get("stream"):
+            try:
+                time.sleep(latency)
+            finally:
+                self.simulator.exit()
+            return ReplayCompletion(body)
+
+        # Streamed: half the latency before the first chunk, the rest spread
+        # over the chunks.
+        pieces = max(1, len(completion_text(body)) // 24)
+        try:
+            time.sleep(latency / 2)
+        except BaseException:
+            self.simulator.exit()
+            raise
+
+        def chunks():
+            try:
+                yield from _stream_chunks(body, latency / 2 / pieces)
+            finally:
+                self.simulator.exit()
+
+        return chunks()
+
+
+class ReplayClient:
+    """OpenAI client stand-in answering chat completions from fixtures."""
+
+    def __init__(self, fixtures: Fixtures, profile: SimulationProfile | None = None):
+        self.simulator = _Simulator(profile or SimulationProfile())
+        self.chat = SimpleNamespace(
+            completions=_ReplayCompletions(fixtures, self.simulator)
+        )
+
+
+class ReplayRetriever:
+    def __init__(self, fixtures: Fixtures, profile: SimulationProfile | None = None):
+        self.fixtures = fixtures
+        self.profile = profile or SimulationProfile()
+
+    def load_sub_ontology(self, search_query: str, search_limit: int = 100) -> dict:
+        key = sub_ontology_key(search_query, search_limit)
+        entry = self.fixtures.get("sub-ontology", key)
+        if self.profile.retrieval_latency_seconds:
+            time.sleep(self.profile.retrieval_latency_seconds)
+        return json.loads(json.dumps(entry["response"]))
+
+
+class _CachingCompletions:
+    def __init__(self, fixtures: Fixtures, recording: Callable[[], Any]) -> None:
+        self.fixtures = fixtures
+        self.recording = recording
+        self.hits = 0
+        self.misses = 0
+
+    def create(self, **kwargs: Any) -> Any:
+        key = completion_key(
+            kwargs["model"], kwargs.get("reasoning_effort", ""), kwargs["messages"]
+        )
+        entry = self.fixtures.entries["completion"].get(key)
+        if entry is None:
+            self.misses += 1
+            return self.recording().chat.completions.create(**kwargs)
+        self.hits += 1
+        if kwargs.get("stream"):
+            return _stream_chunks(entry["body"], 0.0)
+        return ReplayCompletion(entry["body"])
+
+
+class CachingClient:
+    """
+    Answers chat completions recorded in `fixtures`; the others go to the real
+    client, created on the first miss, and are recorded.
+    """
+
+    def __init__(
+        self,
+        fixtures: Fixtures,
+        create_client: Callable[[], Any],
+        writer: FixtureWriter,
+    ) -> None:
+        self._create_client = create_client
+        self._writer = writer
+        self._recording: RecordingClient | None = None
+        self._lock = threading.Lock()
+        self.completions = _CachingCompletions(fixtures, self._recording_client)
+        self.chat = SimpleNamespace(completions=self.completions)
+
+    def _recording_client(self) -> RecordingClient:
+        with self._lock:
+            if self._recording is None:
+                self._recording = RecordingClient(self._create_client(), self._writer)
+            return self._recording
+
+
+class CachingRetriever:
+    """Sub-ontology counterpart of `CachingClient`."""
+
+    def __init__(
+        self,
+        fixtures: Fixtures,
+        create_retriever: Callable[[], Any],
+        writer: FixtureWriter,
+    ) -> None:
+        self.fixtures = fixtures
+        self._create_retriever = create_retriever
+        self._writer = writer
+        self._recording: RecordingRetriever | None = None
+        self._lock = threading.Lock()
+
+    def load_sub_ontology(self, search_query: str, search_limit: int = 100) -> dict:
+        key = sub_ontology_key(search_query, search_limit)
+        entry = self.fixtures.entries["sub-ontology"].get(key)
+        if entry is not None:
+            return json.loads(json.dumps(entry["response"]))
+        with self._lock:
+            if self._recording is None:
+                self._recording = RecordingRetriever(
+                    self._create_retriever(), self._writer
+                )
+        return self._recording.load_sub_ontology(search_query, search_limit)
+
+
+def apply_api_mode(
+    api_mode: str,
+    fixtures_path: str,
+    create_client: Callable[[], Any],
+    create_retriever: Callable[[], Any],
+    profile: SimulationProfile | None = None,
+    on_missing: str = "error",
+) -> tuple[Any, Any]:
+    """
+    Return `(client, retriever)` for `api_mode`: the real ones ("live"), the
+    real ones recording to `fixtures_path` ("record"), stand-ins replaying
+    `fixtures_path` with `profile` ("replay"; nothing real is created), or
+    stand-ins replaying what is recorded and recording the rest ("cache"; the
+    real ones are only created on the first request that is not recorded).
+    """
+    if api_mode == "live":
+        return create_client(), create_retriever()
+    if api_mode == "record":
+        writer = FixtureWriter(fixtures_path)
+        return (
+            RecordingClient(create_client(), writer),
+            RecordingRetriever(create_retriever(), writer),
+        )
+    if api_mode == "replay":
+        fixtures = Fixtures(fixtures_path, on_missing)
+        return ReplayClient(fixtures, profile), ReplayRetriever(fixtures, profile)
+    if api_mode == "cache":
+        fixtures = Fixtures(fixtures_path, allow_missing_file=True)
+        writer = FixtureWriter(fixtures_path)
+        return (
+            CachingClient(fixtures, create_client, writer),
+            CachingRetriever(fixtures, create_retriever, writer),
+        )
+    raise ValueError(f"Unknown api_mode: {api_mode!r} (expected one of {API_MODES})")
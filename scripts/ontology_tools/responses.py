@@ -0,0 +1,262 @@
+"""
+Parsing of model responses into JSON objects.
+
+Responses are supposed to be a single JSON object, but in practice they come
+wrapped in code fences, followed by prose, or slightly malformed. Parsing
+tries, in order:
+
+1. `json.JSONDecoder.raw_decode` from every `{` in the text (so code fences
+   are skipped), which understands string literals, so braces inside a
+   rationale do not end the object, and ignores whatever follows the object;
+2. an object nested inside the decoded one that has the expected keys (e.g. a
+   model answering `{"result": {...}}`);
+3. cheap local repairs — typographic quotes, trailing commas, Python literals,
+   an object cut off before its closing brackets — before the caller pays for
+   another request.
+"""
+
+from __future__ import annotations
+
+import ast
+import json
+import re
+from typing import Any, Iterable
+
+_decoder = json.JSONDecoder()
+
+_FENCE = re.compile(r"```[A-Za-z0-9_-]*[ \t]*\n?")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_SMART_QUOTES = "“”„"
+
+PARSE_OK = "ok"
+PARSE_REPAIRED = "repaired"
+PARSE_FAILED = "failed"
+
+
+def missing_keys(obj: Any, required_keys: Iterable[str] | None) -> list[str]:
+    if not isinstance(obj, dict):
+        return list(required_keys or [])
+    return [key for key in required_keys or [] if key not in obj]
+
+
+def schema_errors(obj: Any, schema: dict, path: str = "") -> list[str]:
+    """
+    Check `obj` against a key schema: a dict mapping each required key to the
+    expected type (or tuple of types), or to a nested schema dict for objects.
+    Returns a list of problems, empty when the object conforms.
+    """
+    if not isinstance(obj, dict):
+        return [f"{path or 'response'} is not an object"]
+    errors = []
+    for key, expected in schema.items():
+        where = f"{path}.{key}" if path else key
+        if key not in obj:
+            errors.append(f"missing {where}")
+        elif isinstance(expected, dict):
+            errors.extend(schema_errors(obj[key], expected, where))
+        elif not isinstance(obj[key], expected):
+            errors.append(f"{where} has type {type(obj[key]).__name__}")
+    return errors
+
+
+def _find_with_keys(obj: Any, required_keys: list[str]) -> dict | None:
+    """Breadth-first search for a dict holding every required key."""
+    pending = [obj]
+    while pending:
+        current = pending.pop(0)
+        if isinstance(current, dict):
+            if not missing_keys(current, required_keys):
+                return current
+            pending.extend(current.values())
+        elif isinstance(current, list):
+            pending.extend(current)
+    return None
+
+
+def _decoded_objects(text: str):
+    """Yield every JSON object that starts at some `{` of `text`."""
+    position = text.find("{")
+    while position != -1:
+        try:
+            obj, end = _decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position = text.find("{", position + 1)
+            continue
+        if isinstance(obj, dict):
+            yield obj
+        # Objects nested in this one are reached through _find_with_keys
+        position = text.find("{", end)
+
+
+def _select(text: str, required_keys: list[str]) -> dict | None:
+    first = None
+    for obj in _decoded_objects(text):
+        if not required_keys:
+            return obj
+        match = _find_with_keys(obj, required_keys)
+        if match is not None:
+            return match
+        if first is None:
+            first = obj
+    return first
+
+
+def _close_truncated(text: str) -> str:
+    """Append the brackets (and quote) left open at the end of `text`."""
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    closing = '"' if in_string else ""
+    return text.rstrip().rstrip(",") + closing + "".join(reversed(stack))
+
+
+def _delimit_smart_quotes(text: str) -> str:
+    """
+    Replace the typographic quotes that delimit strings with '"'. Those inside
+    string contents (e.g. a title quoting a term) are left as they are.
+    """
+    chars = list(text)
+    closers = ""
+    escaped = False
+    for position, char in enumerate(chars):
+        if closers:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char in closers:
+                chars[position] = '"'
+                closers = ""
+        elif char == '"':
+            closers = '"'
+        elif char in _SMART_QUOTES:
+            chars[position] = '"'
+            # Closed by a straight quote or the matching typographic one („“)
+            closers = '"”' + ("“" if char == "„" else "")
+    return "".join(chars)
+
+
+def repair_json(text: str) -> dict | None:
+    """Best-effort local repair of a malformed object; None if it still fails."""
+    start = text.find("{")
+    if start == -1:
+        return None
+    candidate = _FENCE.sub("", text[start:])
+    candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+    # Typographic quotes are only replaced if the text does not parse as is
+    candidates = [candidate]
+    if any(quote in candidate for quote in _SMART_QUOTES):
+        candidates.append(_delimit_smart_quotes(candidate))
+
+    for candidate in candidates:
+        for attempt in (candidate, _close_truncated(candidate)):
+            try:
+                obj, _ = _decoder.raw_decode(attempt)
+                if isinstance(obj, dict):
+                    return obj
+            except json.JSONDecodeError:
+                pass
+    # Python-style dicts: single quotes, True/False/None
+    for candidate in candidates:
+        end = candidate.rfind("}")
+        if end == -1:
+            continue
+        try:
+            obj = ast.literal_eval(candidate[: end + 1])
+            if isinstance(obj, dict):
+                return obj
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    return None
+
+
+def parse_response(
+    text: str, required_keys: Iterable[str] | None = None
+) -> tuple[dict | None, str]:
+    """
+    Return `(object, status)` for a model response. `status` is `PARSE_OK` for
+    an object decoded as is, `PARSE_REPAIRED` when a local repair was needed
+    and `PARSE_FAILED` when no object was found. When `required_keys` is given,
+    an object holding all of them is preferred; the returned object may still
+    miss some if none does, so callers keep validating.
+    """
+    required = list(required_keys or [])
+    if not text or "{" not in text:
+        return None, PARSE_FAILED
+
+    obj = _select(text, required)
+    if obj is not None and not missing_keys(obj, required):
+        return obj, PARSE_OK
+
+    repaired = repair_json(text)
+    if repaired is not None:
+        match = _find_with_keys(repaired, required) if required else repaired
+        if match is not None:
+            return match, PARSE_REPAIRED
+    if obj is not None:
+        return obj, PARSE_OK
+    if repaired is not None:
+        return repaired, PARSE_REPAIRED
+    return None, PARSE_FAILED
+
+
+class ObjectScanner:
+    """
+    Tracks top-level `{...}` spans in text that arrives in chunks, e.g. a
+    streamed completion. Quotes only count inside an object, so apostrophes in
+    surrounding prose do not confuse it.
+    """
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.depth = 0
+        self.start = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> list[tuple[int, int]]:
+        """Returns the `(start, end)` offsets of every object closed by `chunk`."""
+        spans = []
+        for i, char in enumerate(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == "{":
+                if self.depth == 0:
+                    self.start = self.offset + i
+                self.depth += 1
+            elif self.depth == 0:
+                continue
+            elif char == '"':
+                self.in_string = True
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    spans.append((self.start, self.offset + i + 1))
+        self.offset += len(chunk)
+        return spans
+
+
+def extract_object(text: str, required_keys: Iterable[str] | None = None):
+    """
+    Extracts and parses the JSON object of a model response. Returns a dict,
+    or None if no object can be found or repaired.
+    """
+    return parse_response(text, required_keys)[0]
@@ -0,0 +1,191 @@
+"""
+Result sinks for the classification scripts.
+
+`CsvResultSink` is the original behaviour: every result is written to the
+output CSV and flushed right away. `SQLiteResultSink` instead buffers results
+and inserts them in batches into an SQLite table with one column per output
+field plus indexed `run_id`, `item_id` and `node_title` columns and a numeric
+`cost_usd`, so analyses such as
+
+    SELECT node_title, COUNT(*), SUM(cost_usd) FROM results
+    WHERE run_id = ? GROUP BY node_title
+
+run on the index instead of re-parsing a CSV with multi-line cells. The output
+CSV is still produced, exported from the table when the sink is closed.
+"""
+
+from __future__ import annotations
+
+import csv
+import sqlite3
+from typing import Any
+
+RESULT_STORES = ("csv", "sqlite")
+
+
+class CsvResultSink:
+    def __init__(self, csv_path: str, fieldnames: list[str]) -> None:
+        self.fieldnames = fieldnames
+        self._file = open(csv_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+
+    def write(
+        self,
+        item_id: str,
+        fields: dict[str, Any],
+        node_title: str | None = None,
+        cost: Any = None,
+    ) -> None:
+        self._writer.writerow(fields)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "CsvResultSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _to_float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SQLiteResultSink:
+    """
+    Batched writer to `table` in the SQLite database at `db_path`. Rows of a
+    run are keyed by `(run_id, item_id)`; writing an item again replaces it.
+    On close, the run's rows are exported to `csv_path` (if given) in the
+    order they were written.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        fieldnames: list[str],
+        run_id: str,
+        csv_path: str | None = None,
+        table: str = "results",
+        batch_size: int = 100,
+    ) -> None:
+        self.fieldnames = fieldnames
+        self.run_id = run_id
+        self.csv_path = csv_path
+        self.table = table
+        self.batch_size = batch_size
+        self._pending: list[tuple] = []
+        self._connection = sqlite3.connect(db_path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_table()
+        columns = ["run_id", "item_id", "node_title", "cost_usd", *fieldnames]
+        self._insert = (
+            f"INSERT OR REPLACE INTO {_quote(table)} "
+            f"({', '.join(_quote(column) for column in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+
+    def _create_table(self) -> None:
+        table = _quote(self.table)
+        field_columns = "".join(f", {_quote(name)} TEXT" for name in self.fieldnames)
+        with self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "run_id TEXT NOT NULL, item_id TEXT NOT NULL, node_title TEXT, "
+                f"cost_usd REAL{field_columns}, PRIMARY KEY (run_id, item_id))"
+            )
+            existing = {
+                row[1]
+                for row in self._connection.execute(f"PRAGMA table_info({table})")
+            }
+            missing = [name for name in self.fieldnames if name not in existing]
+            if missing:
+                raise ValueError(
+                    f"Table {self.table!r} exists without the columns {missing}; "
+                    "use another database or table"
+                )
+            for column in ("run_id", "item_id", "node_title"):
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS "
+                    f"{_quote(f'{self.table}_{column}')} ON {table} ({column})"
+                )
+
+    def write(
+        self,
+        item_id: str,
+        fields: dict[str, Any],
+        node_title: str | None = None,
+        cost: Any = None,
+    ) -> None:
+        values = [fields.get(name) for name in self.fieldnames]
+        self._pending.append(
+            (self.run_id, item_id, node_title, _to_float(cost), *values)
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany(self._insert, self._pending)
+        self._pending = []
+
+    def export_csv(self, csv_path: str, run_id: str | None = None) -> int:
+        """Write the rows of `run_id` (default: this run) to `csv_path`."""
+        self.flush()
+        columns = ", ".join(_quote(name) for name in self.fieldnames)
+        rows = self._connection.execute(
+            f"SELECT {columns} FROM {_quote(self.table)} "
+            "WHERE run_id = ? ORDER BY rowid",
+            (run_id or self.run_id,),
+        )
+        count = 0
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.fieldnames)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+    def close(self) -> None:
+        self.flush()
+        if self.csv_path:
+            self.export_csv(self.csv_path)
+        self._connection.close()
+
+    def __enter__(self) -> "SQLiteResultSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def create_result_sink(
+    store: str,
+    csv_path: str,
+    fieldnames: list[str],
+    db_path: str | None = None,
+    run_id: str | None = None,
+):
+    """Return the sink for `store` ("csv" or "sqlite")."""
+    if store == "csv":
+        return CsvResultSink(csv_path, fieldnames)
+    if store == "sqlite":
+        if not db_path or not run_id:
+            raise ValueError("The sqlite result store needs a db_path and a run_id")
+        return SQLiteResultSink(db_path, fieldnames, run_id, csv_path)
+    raise ValueError(
+        f"Unknown result store: {store!r} (expected one of {RESULT_STORES})"
+    )
@@ -0,0 +1,396 @@
+"""
+Streaming validator for review datasets (`review-datasets*/`).
+
+A dataset ships `all_proposals.jsonl` and `all_controls.jsonl`, the same records
+split by issue type under `proposals/` and `controls/`, `manual_checks.jsonl`,
+a `manifest.json`, `schema/review-proposal.schema.json` and the
+`ontology-snapshot.json` the proposals were written against. This checks, for
+every line of every file:
+
+- it parses and matches the proposal schema (compiled once per worker),
+- its `datasetVersion` is the manifest's and, in a per-type file, its
+  `issueType` is the file's,
+- `subject.path` follows existing edges of the snapshot (the same rule as
+  `validatePath` in `src/lib/somReview/ontologySnapshot.ts`),
+- `subject.relatedTitles` name snapshot nodes (reported as warnings, since some
+  proposals list synonyms or new titles there),
+
+and across files that proposal ids are unique and that `all_proposals.jsonl`
+(`all_controls.jsonl`) holds exactly the records of `proposals/*.jsonl`
+(`controls/*.jsonl`). Lines are read in chunks and checked in a process pool;
+only a digest per record is kept for the cross-file checks.
+
+    python -m ontology_tools.review_validation \\
+        Buy_Society_of_Mind_Title_Followup_2026-07-25/review-datasets-title-followup-v1
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, Tuple
+
+from . import json_codec
+from .compiled import load_graph
+from .graph import OntologyGraph
+from .schema import compile_schema
+
+SCHEMA_FILE = os.path.join("schema", "review-proposal.schema.json")
+SNAPSHOT_FILE = "ontology-snapshot.json"
+# Combined file -> directory of per-issue-type files holding the same records
+SPLIT_FILES = {"all_proposals.jsonl": "proposals", "all_controls.jsonl": "controls"}
+OTHER_FILES = ("manual_checks.jsonl",)
+
+# Error messages kept for the report; the rest are only counted
+MAX_MESSAGES = 200
+
+COLLECTION_LABEL_RE = re.compile(r"^\[[^\]]+\]$")
+
+# (file, line number, proposalId, issueType, digest, errors, warnings)
+LineResult = Tuple[str, int, Any, Any, str, list, list]
+
+
+def normalize_collection(value: str | None) -> str:
+    unwrapped = (value or "").strip()
+    unwrapped = unwrapped[1:] if unwrapped.startswith("[") else unwrapped
+    unwrapped = unwrapped[:-1] if unwrapped.endswith("]") else unwrapped
+    return "main" if not unwrapped or unwrapped == "default" else unwrapped
+
+
+def is_collection_label(value: str) -> bool:
+    return COLLECTION_LABEL_RE.match(value.strip()) is not None
+
+
+class SnapshotIndex:
+    """Title and edge lookups over an `OntologyGraph` for the snapshot checks."""
+
+    def __init__(self, graph: OntologyGraph) -> None:
+        self.graph = graph
+        self.root_title = graph.titles[graph.root] if graph.root is not None else ""
+        self.edge_pairs: set[tuple[int, int]] = set()
+        self.edge_keys: set[tuple[int, str, int]] = set()
+        for parent in range(len(graph)):
+            start, end = graph.child_offsets[parent], graph.child_offsets[parent + 1]
+            for position in range(start, end):
+                child = graph.child_index[position]
+                name = graph.collection_names[graph.child_collection[position]]
+                self.edge_pairs.add((parent, child))
+                self.edge_keys.add((parent, normalize_collection(name), child))
+
+    def path_errors(self, path: Any) -> list[str]:
+        """
+        Consecutive known titles of `path` (from the branch root on) must be
+        joined by an edge, in the collection named by a `[...]` label between
+        them if there is one. Unknown titles are skipped, as in the web app.
+        """
+        if not isinstance(path, list):
+            return []
+        if self.root_title in path:
+            path = path[path.index(self.root_title) :]
+        errors = []
+        parent = None
+        collection = "main"
+        for part in path:
+            if not isinstance(part, str) or not part.strip():
+                continue
+            if is_collection_label(part):
+                collection = normalize_collection(part)
+                continue
+            nodes = self.graph.indices_of_title(part)
+            if not nodes:
+                continue
+            if len(nodes) > 1:
+                errors.append(f"subject.path: ambiguous title {part!r}")
+                return errors
+            node = nodes[0]
+            if parent is not None and parent != node:
+                if collection == "main":
+                    missing = (parent, node) not in self.edge_pairs
+                else:
+                    missing = (parent, collection, node) not in self.edge_keys
+                if missing:
+                    errors.append(
+                        "subject.path: no edge "
+                        f"{self.graph.titles[parent]!r} [{collection}] -> {part!r}"
+                    )
+            parent = node
+            collection = "main"
+        return errors
+
+    def unknown_titles(self, titles: Any) -> list[str]:
+        if not isinstance(titles, list):
+            return []
+        return [
+            title
+            for title in titles
+            if isinstance(title, str) and not self.graph.indices_of_title(title)
+        ]
+
+
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(schema: dict, snapshot_path: str, dataset_version: str) -> None:
+    _worker["validate"] = compile_schema(schema)
+    _worker["index"] = SnapshotIndex(load_graph(snapshot_path))
+    _worker["dataset_version"] = dataset_version
+
+
+def validate_lines(
+    source: str, expected_issue: str | None, lines: list[tuple[int, str]]
+) -> list[LineResult]:
+    """Check `lines` of the file `source` (see the module docstring)."""
+    validate = _worker["validate"]
+    index: SnapshotIndex = _worker["index"]
+    results = []
+    for line_number, line in lines:
+        try:
+            record = json_codec.loads(line)
+        except ValueError as e:
+            error = f"bad JSON: {e}"
+            results.append((source, line_number, None, None, "", [error], []))
+            continue
+        errors = validate(record)
+        warnings = []
+        if isinstance(record, dict):
+            if record.get("datasetVersion") != _worker["dataset_version"]:
+                errors.append(
+                    f"datasetVersion {record.get('datasetVersion')!r} is not the "
+                    f"manifest's {_worker['dataset_version']!r}"
+                )
+            if expected_issue and record.get("issueType") != expected_issue:
+                errors.append(
+                    f"issueType {record.get('issueType')!r} in {expected_issue}.jsonl"
+                )
+            subject = record.get("subject")
+            if isinstance(subject, dict):
+                errors.extend(index.path_errors(subject.get("path")))
+                warnings.extend(
+                    f"subject.relatedTitles: unknown title {title!r}"
+                    for title in index.unknown_titles(subject.get("relatedTitles"))
+                )
+            proposal_id, issue_type = record.get("proposalId"), record.get("issueType")
+        else:
+            proposal_id = issue_type = None
+        # The combined and per-type files are written by the same serializer,
+        # so the same record has the same line
+        digest = hashlib.blake2b(line.strip().encode("utf-8"), digest_size=16)
+        digest = digest.hexdigest()
+        results.append(
+            (source, line_number, proposal_id, issue_type, digest, errors, warnings)
+        )
+    return results
+
+
+def dataset_files(dataset_dir: str) -> list[tuple[str, str | None]]:
+    """`(relative path, expected issueType or None)` of every JSONL file to check."""
+    files: list[tuple[str, str | None]] = []
+    for combined, split_dir in SPLIT_FILES.items():
+        if os.path.exists(os.path.join(dataset_dir, combined)):
+            files.append((combined, None))
+        directory = os.path.join(dataset_dir, split_dir)
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".jsonl"):
+                    files.append((f"{split_dir}/{name}", name[: -len(".jsonl")]))
+    for name in OTHER_FILES:
+        if os.path.exists(os.path.join(dataset_dir, name)):
+            files.append((name, None))
+    return files
+
+
+def _chunks(
+    dataset_dir: str, files: list[tuple[str, str | None]], chunk_size: int
+) -> Iterator[tuple[str, str | None, list[tuple[int, str]]]]:
+    for source, expected_issue in files:
+        chunk: list[tuple[int, str]] = []
+        with open(os.path.join(dataset_dir, source), encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                chunk.append((line_number, line))
+                if len(chunk) >= chunk_size:
+                    yield source, expected_issue, chunk
+                    chunk = []
+        if chunk:
+            yield source, expected_issue, chunk
+
+
+def _create_pool(processes: int, initargs: tuple) -> ProcessPoolExecutor | None:
+    if hasattr(os, "sched_getaffinity"):
+        processes = min(processes, len(os.sched_getaffinity(0)))
+    else:
+        processes = min(processes, os.cpu_count() or 1)
+    if processes < 2:
+        return None
+    return ProcessPoolExecutor(processes, initializer=_init_worker, initargs=initargs)
+
+
+class _Report:
+    def __init__(self) -> None:
+        self.lines: dict[str, int] = {}
+        self.error_count = 0
+        self.warning_count = 0
+        self.messages: list[str] = []
+        self.warnings: list[str] = []
+
+    def error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.messages) < MAX_MESSAGES:
+            self.messages.append(message)
+
+    def warn(self, message: str) -> None:
+        self.warning_count += 1
+        if len(self.warnings) < MAX_MESSAGES:
+            self.warnings.append(message)
+
+
+def _compare_split(
+    report: _Report, combined: str, whole: dict[str, str], parts: dict[str, str]
+) -> None:
+    for proposal_id in whole.keys() - parts.keys():
+        report.error(f"{combined}: {proposal_id} is in no per-type file")
+    for proposal_id in parts.keys() - whole.keys():
+        report.error(f"{combined}: {proposal_id} from a per-type file is missing")
+    for proposal_id in whole.keys() & parts.keys():
+        if whole[proposal_id] != parts[proposal_id]:
+            report.error(f"{combined}: {proposal_id} differs from its per-type copy")
+
+
+def validate_dataset(
+    dataset_dir: str,
+    snapshot_path: str | None = None,
+    processes: int = 4,
+    chunk_size: int = 2000,
+    max_pending_chunks: int = 8,
+) -> dict:
+    """Validate the dataset in `dataset_dir` and return the report."""
+    started = time.perf_counter()
+    with open(os.path.join(dataset_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    with open(os.path.join(dataset_dir, SCHEMA_FILE), encoding="utf-8") as f:
+        schema = json.load(f)
+    snapshot_path = snapshot_path or os.path.join(dataset_dir, SNAPSHOT_FILE)
+    initargs = (schema, snapshot_path, manifest.get("datasetVersion"))
+
+    files = dataset_files(dataset_dir)
+    report = _Report()
+    # Digests by proposal id: per combined file, and per split directory
+    digests: dict[str, dict[str, str]] = {}
+    locations: dict[str, str] = {}
+
+    def collect(results: Iterable[LineResult]) -> None:
+        for source, line_number, proposal_id, _, digest, errors, warnings in results:
+            where = f"{source}:{line_number}"
+            report.lines[source] = report.lines.get(source, 0) + 1
+            for message in errors:
+                report.error(f"{where} {proposal_id or ''}: {message}")
+            for message in warnings:
+                report.warn(f"{where} {proposal_id or ''}: {message}")
+            if not isinstance(proposal_id, str):
+                continue
+            group = source.split("/")[0] if "/" in source else source
+            seen = digests.setdefault(group, {})
+            if "/" in source and proposal_id in seen:
+                report.error(f"{where}: duplicate proposalId {proposal_id}")
+            seen[proposal_id] = digest
+            if "/" not in source:
+                if proposal_id in locations:
+                    report.error(
+                        f"{where}: proposalId {proposal_id} is also in "
+                        f"{locations[proposal_id]}"
+                    )
+                else:
+                    locations[proposal_id] = where
+
+    pool = _create_pool(processes, initargs)
+    if pool is None:
+        _init_worker(*initargs)
+    pending: deque[Future | list] = deque()
+    try:
+        for source, expected_issue, chunk in _chunks(dataset_dir, files, chunk_size):
+            if pool is None:
+                collect(validate_lines(source, expected_issue, chunk))
+                continue
+            pending.append(pool.submit(validate_lines, source, expected_issue, chunk))
+            while len(pending) >= max_pending_chunks:
+                collect(pending.popleft().result())
+        while pending:
+            collect(pending.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for combined, split_dir in SPLIT_FILES.items():
+        if combined in digests or split_dir in digests:
+            _compare_split(
+                report, combined, digests.get(combined, {}), digests.get(split_dir, {})
+            )
+
+    return {
+        "dataset": dataset_dir,
+        "datasetVersion": manifest.get("datasetVersion"),
+        "lines": report.lines,
+        "records": sum(report.lines.values()),
+        "errors": report.error_count,
+        "warnings": report.warning_count,
+        "errorMessages": report.messages,
+        "warningMessages": report.warnings,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def format_report(report: dict, show_warnings: bool = False) -> str:
+    lines = [
+        f"{report['dataset']}: {report['records']} records in "
+        f"{len(report['lines'])} files, {report['errors']} errors, "
+        f"{report['warnings']} warnings ({report['seconds']}s)"
+    ]
+    lines.extend(f"  error: {message}" for message in report["errorMessages"])
+    if show_warnings:
+        lines.extend(f"  warning: {message}" for message in report["warningMessages"])
+    hidden = report["errors"] - len(report["errorMessages"])
+    if hidden > 0:
+        lines.append(f"  ... and {hidden} more errors")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("datasets", nargs="+", help="review dataset directories")
+    parser.add_argument(
+        "--snapshot",
+        default=None,
+        help="snapshot (or compiled ontology) to check against instead of the "
+        "dataset's ontology-snapshot.json",
+    )
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--warnings", action="store_true", help="list warnings")
+    parser.add_argument("--json", default=None, help="also write the reports here")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for dataset_dir in args.datasets:
+        report = validate_dataset(
+            dataset_dir, args.snapshot, args.processes, args.chunk_size
+        )
+        print(format_report(report, args.warnings))
+        reports.append(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+            f.write("\n")
+    if any(report["errors"] for report in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Rate-limit-aware scheduling of model calls.
+
+`RequestScheduler.call` wraps one API call with:
+
+- token buckets for requests per minute and tokens per minute, so calls wait
+  for quota instead of being rejected;
+- an adaptive concurrency limit: halved on every 429 response, raised by one
+  after a run of successful calls (additive increase, multiplicative decrease);
+- exponential backoff with full jitter for 429s and transient server or
+  connection errors, honouring `Retry-After` when the API sends it.
+
+`RequestScheduler.imap` runs a function over many items on a thread pool, so
+the concurrency limit above actually has callers to admit.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+TRANSIENT_STATUS_CODES = {408, 409, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "InternalServerError"}
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return (
+        getattr(error, "status_code", None) == 429
+        or type(error).__name__ == "RateLimitError"
+    )
+
+
+def is_transient_error(error: BaseException) -> bool:
+    return (
+        getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES
+        or type(error).__name__ in TRANSIENT_ERROR_NAMES
+    )
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute up to `capacity`. `acquire` blocks
+    until the requested amount is available; `refund` corrects an estimate
+    once the real cost is known (the level may go negative to carry a debt).
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        # Requests larger than the bucket would never fit; let them drain it.
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                wait = (amount - self.level) / self.rate
+            time.sleep(min(wait, 5.0))
+
+    def refund(self, amount: float) -> None:
+        with self.lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit between `minimum` and `maximum` that can move at runtime."""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 32) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self) -> "AdaptiveLimiter":
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def decrease(self) -> int:
+        with self.condition:
+            self.limit = max(self.minimum, self.limit // 2)
+            return self.limit
+
+    def increase(self) -> int:
+        with self.condition:
+            self.limit = min(self.maximum, self.limit + 1)
+            self.condition.notify_all()
+            return self.limit
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 500_000,
+        max_concurrency: int = 8,
+        initial_concurrency: int | None = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        successes_per_increase: int = 10,
+    ) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.limiter = AdaptiveLimiter(
+            initial_concurrency or max(1, max_concurrency // 2), 1, max_concurrency
+        )
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.successes_per_increase = successes_per_increase
+        self._successes = 0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "rateLimited": 0, "failures": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        hinted = retry_after_seconds(error)
+        if hinted is not None:
+            return min(self.max_delay, hinted)
+        # Full jitter: uniform in [0, base * 2^attempt], capped.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self._successes += 1
+            if self._successes < self.successes_per_increase:
+                return
+            self._successes = 0
+        self.limiter.increase()
+
+    def call(
+        self,
+        fn: Callable[[], R],
+        estimated_tokens: int = 0,
+        actual_tokens: Callable[[R], int | None] | None = None,
+    ) -> R:
+        """
+        Run `fn()` within the rate limits, retrying rate-limit and transient
+        errors. Any other error, or the last retryable one, is raised. The
+        quota reserved for `estimated_tokens` is corrected to `actual_tokens`
+        of the result unless that is None (usage unknown).
+        """
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire(1)
+            if estimated_tokens:
+                self.tokens.acquire(estimated_tokens)
+            self._count("calls")
+            try:
+                with self.limiter:
+                    result = fn()
+            except Exception as error:
+                # The request was rejected or never completed: give the
+                # token estimate back before waiting.
+                if estimated_tokens:
+                    self.tokens.refund(estimated_tokens)
+                rate_limited = is_rate_limit_error(error)
+                if not rate_limited and not is_transient_error(error):
+                    self._count("failures")
+                    raise
+                if attempt == self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt, error)
+                self._count("retries")
+                if rate_limited:
+                    self._count("rateLimited")
+                    with self._lock:
+                        self._successes = 0
+                    limit = self.limiter.decrease()
+                    print(
+                        f"Rate limited; concurrency -> {limit}, "
+                        f"retrying in {delay:.1f}s..."
+                    )
+                else:
+                    print(f"{type(error).__name__}; retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+
+            if actual_tokens and estimated_tokens:
+                try:
+                    used = actual_tokens(result)
+                    if used is not None:
+                        self.tokens.refund(estimated_tokens - used)
+                except Exception:
+                    pass
+            self._record_success()
+            return result
+        raise RuntimeError("unreachable")
+
+    def imap(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        """
+        Apply `fn` to `items` on up to `max_concurrency` threads and yield the
+        results in input order. At most twice that many items are in flight,
+        so large inputs are not read ahead all at once.
+        """
+        window = self.max_concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            pending = []
+            for item in items:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= window:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
@@ -0,0 +1,296 @@
+"""
+Compile the JSON Schemas shipped with the review datasets into Python checks.
+
+The `schema/*.schema.json` files are draft-07 schemas generated from zod. The
+web app validates them with Ajv; `compile_schema` turns one into a tree of
+closures once, so validating a record is plain function calls instead of
+re-interpreting the schema for every line. It covers the keywords these
+schemas use and raises ValueError for any other validation keyword rather than
+silently accepting it.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Callable
+
+# check(value, path, errors) appends "path: message" strings to errors
+Check = Callable[[Any, str, list], None]
+
+# Keywords that carry no validation
+ANNOTATIONS = {
+    "$schema", "$id", "$comment", "title", "description", "default", "examples",
+    "definitions",
+}
+
+DATE_TIME_RE = re.compile(
+    r"^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(\.\d+)?([Zz]|[+-]\d{2}:\d{2})$"
+)
+FORMATS: dict[str, Callable[[str], bool]] = {
+    "date-time": lambda value: DATE_TIME_RE.match(value) is not None,
+}
+
+# Types that are a plain isinstance check, and tests for the numeric ones
+_PYTHON_TYPES: dict[str, type] = {
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+    "object": dict,
+    "array": list,
+}
+_TYPES: dict[str, Callable[[Any], bool]] = {
+    "number": lambda value: isinstance(value, (int, float))
+    and not isinstance(value, bool),
+    "integer": lambda value: (isinstance(value, int) and not isinstance(value, bool))
+    or (isinstance(value, float) and value.is_integer()),
+}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+class _Compiler:
+    def __init__(self, root: dict) -> None:
+        self.root = root
+        self.refs: dict[str, Check] = {}
+
+    def resolve(self, ref: str) -> Check:
+        compiled = self.refs.get(ref)
+        if compiled is not None:
+            return compiled
+        if not ref.startswith("#"):
+            raise ValueError(f"Only local $refs are supported: {ref}")
+        target: Any = self.root
+        for part in ref[1:].split("/")[1:]:
+            target = target[part.replace("~1", "/").replace("~0", "~")]
+
+        # Register a forwarder first so recursive references terminate
+        holder: list[Check] = []
+        self.refs[ref] = lambda value, path, errors: holder[0](value, path, errors)
+        holder.append(self.compile(target))
+        self.refs[ref] = holder[0]
+        return holder[0]
+
+    def compile(self, schema: Any) -> Check:
+        if schema is True or schema == {}:
+            return lambda value, path, errors: None
+        if schema is False:
+            return lambda value, path, errors: errors.append(f"{path}: not allowed")
+        checks = [self._keyword(schema, key) for key in schema]
+        checks = [check for check in checks if check is not None]
+
+        def check_all(value: Any, path: str, errors: list) -> None:
+            for check in checks:
+                check(value, path, errors)
+
+        return checks[0] if len(checks) == 1 else check_all
+
+    def _keyword(self, schema: dict, key: str) -> Check | None:
+        argument = schema[key]
+        if key in ANNOTATIONS:
+            return None
+        if key == "$ref":
+            return self.resolve(argument)
+        if key == "type":
+            names = argument if isinstance(argument, list) else [argument]
+            simple = tuple(_PYTHON_TYPES[n] for n in names if n in _PYTHON_TYPES)
+            tests = [_TYPES[name] for name in names if name not in _PYTHON_TYPES]
+            expected = " or ".join(names)
+            if not tests:
+
+                def check_simple_type(value, path, errors):
+                    if not isinstance(value, simple):
+                        errors.append(f"{path}: expected {expected}")
+
+                return check_simple_type
+
+            def check_type(value, path, errors):
+                if not isinstance(value, simple) and not any(
+                    test(value) for test in tests
+                ):
+                    errors.append(f"{path}: expected {expected}")
+
+            return check_type
+        if key == "const":
+            if isinstance(argument, str):
+
+                def check_string_const(value, path, errors):
+                    if value != argument or not isinstance(value, str):
+                        errors.append(f"{path}: expected {json.dumps(argument)}")
+
+                return check_string_const
+            expected = _canonical(argument)
+
+            def check_const(value, path, errors):
+                if value != argument or _canonical(value) != expected:
+                    errors.append(f"{path}: expected {json.dumps(argument)}")
+
+            return check_const
+        if key == "enum":
+            if all(isinstance(option, str) for option in argument):
+                options = frozenset(argument)
+
+                def check_string_enum(value, path, errors):
+                    if not isinstance(value, str) or value not in options:
+                        errors.append(f"{path}: {json.dumps(value)} is not allowed")
+
+                return check_string_enum
+            allowed = {_canonical(option) for option in argument}
+
+            def check_enum(value, path, errors):
+                if _canonical(value) not in allowed:
+                    errors.append(f"{path}: {json.dumps(value)} is not allowed")
+
+            return check_enum
+        if key == "properties":
+            properties = {name: self.compile(sub) for name, sub in argument.items()}
+
+            def check_properties(value, path, errors):
+                if isinstance(value, dict):
+                    for name, check in properties.items():
+                        if name in value:
+                            check(value[name], f"{path}.{name}", errors)
+
+            return check_properties
+        if key == "required":
+
+            def check_required(value, path, errors):
+                if isinstance(value, dict):
+                    for name in argument:
+                        if name not in value:
+                            errors.append(f"{path}: missing required {name!r}")
+
+            return check_required
+        if key == "additionalProperties":
+            known = set(schema.get("properties") or {})
+            extra = None if isinstance(argument, bool) else self.compile(argument)
+
+            def check_additional(value, path, errors):
+                if not isinstance(value, dict):
+                    return
+                for name in value:
+                    if name in known:
+                        continue
+                    if extra is not None:
+                        extra(value[name], f"{path}.{name}", errors)
+                    elif argument is False:
+                        errors.append(f"{path}: unexpected property {name!r}")
+
+            return check_additional
+        if key == "items":
+            if isinstance(argument, list):
+                raise ValueError("Tuple-form `items` is not supported")
+            item = self.compile(argument)
+
+            def check_items(value, path, errors):
+                if isinstance(value, list):
+                    for i, element in enumerate(value):
+                        item(element, f"{path}[{i}]", errors)
+
+            return check_items
+        if key in ("anyOf", "oneOf"):
+            options = [self.compile(sub) for sub in argument]
+            exactly_one = key == "oneOf"
+
+            def check_options(value, path, errors):
+                matches = 0
+                for option in options:
+                    option_errors: list[str] = []
+                    option(value, path, option_errors)
+                    if not option_errors:
+                        matches += 1
+                        if not exactly_one:
+                            return
+                if matches == 0 or (exactly_one and matches > 1):
+                    errors.append(f"{path}: does not match {key}")
+
+            return check_options
+        if key == "allOf":
+            parts = [self.compile(sub) for sub in argument]
+
+            def check_parts(value, path, errors):
+                for part in parts:
+                    part(value, path, errors)
+
+            return check_parts
+        if key in ("minLength", "maxLength"):
+            minimum = key == "minLength"
+
+            def check_length(value, path, errors):
+                if isinstance(value, str) and (
+                    len(value) < argument if minimum else len(value) > argument
+                ):
+                    errors.append(f"{path}: violates {key} {argument}")
+
+            return check_length
+        if key in ("minItems", "maxItems"):
+            minimum = key == "minItems"
+
+            def check_count(value, path, errors):
+                if isinstance(value, list) and (
+                    len(value) < argument if minimum else len(value) > argument
+                ):
+                    errors.append(f"{path}: violates {key} {argument}")
+
+            return check_count
+        if key == "uniqueItems":
+            if not argument:
+                return None
+
+            def check_unique(value, path, errors):
+                if isinstance(value, list):
+                    seen = {_canonical(element) for element in value}
+                    if len(seen) != len(value):
+                        errors.append(f"{path}: items are not unique")
+
+            return check_unique
+        if key in ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"):
+            compare = {
+                "minimum": lambda value: value >= argument,
+                "maximum": lambda value: value <= argument,
+                "exclusiveMinimum": lambda value: value > argument,
+                "exclusiveMaximum": lambda value: value < argument,
+            }[key]
+
+            def check_bound(value, path, errors):
+                if _is_number(value) and not compare(value):
+                    errors.append(f"{path}: violates {key} {argument}")
+
+            return check_bound
+        if key == "pattern":
+            pattern = re.compile(argument)
+
+            def check_pattern(value, path, errors):
+                if isinstance(value, str) and not pattern.search(value):
+                    errors.append(f"{path}: does not match {argument!r}")
+
+            return check_pattern
+        if key == "format":
+            test = FORMATS.get(argument)
+            if test is None:
+                return None
+
+            def check_format(value, path, errors):
+                if isinstance(value, str) and not test(value):
+                    errors.append(f"{path}: is not a valid {argument}")
+
+            return check_format
+        raise ValueError(f"Unsupported JSON Schema keyword: {key}")
+
+
+def compile_schema(schema: dict) -> Callable[[Any], list[str]]:
+    """Validator for `schema`: returns the list of errors (empty when valid)."""
+    check = _Compiler(schema).compile(schema)
+
+    def validate(value: Any) -> list[str]:
+        errors: list[str] = []
+        check(value, "$", errors)
+        return errors
+
+    return validate
@@ -0,0 +1,64 @@
+"""
+Load `som-ontology-snapshot-v1` files (the `ontology-snapshot.json` files shipped
+with the review datasets and `artifacts/rob-*` directories).
+
+A snapshot is a flat description of one ontology branch:
+
+    {
+      "schemaVersion": "som-ontology-snapshot-v1",
+      "branchRootNodeId": "...",          # older Sell exports use sellRootNodeId
+      "nodes": [{"id", "title", "description", "synsets", ...}],
+      "edges": [{"parentId", "childId", "collectionName"}]
+    }
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+from . import json_codec
+
+SNAPSHOT_SCHEMA_VERSION = "som-ontology-snapshot-v1"
+
+Snapshot = Dict[str, Any]
+
+
+def load_snapshot(path: str) -> Snapshot:
+    return validate_snapshot(json_codec.read_json(path), path)
+
+
+def is_snapshot(data: Any) -> bool:
+    return isinstance(data, dict) and "schemaVersion" in data and "nodes" in data
+
+
+def validate_snapshot(snapshot: Any, path: str) -> Snapshot:
+    """Return `snapshot` (parsed from `path`) or raise ValueError if it is not one."""
+    if not isinstance(snapshot, dict):
+        raise ValueError(f"{path}: snapshot must be a JSON object")
+    version = snapshot.get("schemaVersion")
+    if version != SNAPSHOT_SCHEMA_VERSION:
+        raise ValueError(
+            f"{path}: unsupported schemaVersion {json.dumps(version)} "
+            f"(expected {json.dumps(SNAPSHOT_SCHEMA_VERSION)})"
+        )
+    if not isinstance(snapshot.get("nodes"), list) or not isinstance(
+        snapshot.get("edges"), list
+    ):
+        raise ValueError(f"{path}: snapshot must contain `nodes` and `edges` lists")
+    return snapshot
+
+
+def snapshot_root_id(snapshot: Snapshot) -> str | None:
+    """
+    Root node id of the snapshot branch. Falls back to the first node that is
+    never a child when neither root id field is present.
+    """
+    root_id = snapshot.get("branchRootNodeId") or snapshot.get("sellRootNodeId")
+    if root_id:
+        return root_id
+    child_ids = {edge["childId"] for edge in snapshot["edges"]}
+    for node in snapshot["nodes"]:
+        if node["id"] not in child_ids:
+            return node["id"]
+    return None
@@ -0,0 +1,165 @@
+"""
+Diff two `som-ontology-snapshot-v1` files by node id.
+
+Title paths (as in `compare-hierarchy-to-transformed.py`) break as soon as a
+node is retitled; snapshot node ids do not change. `diff_snapshots` joins the
+two node lists and the two edge lists on ids, one hash lookup per node and
+edge, and yields a change log of small records:
+
+    {"op": "add-node", "id", "title"}
+    {"op": "remove-node", "id", "title"}
+    {"op": "retitle", "id", "from", "to"}
+    {"op": "redescribe", "id", "title", "from", "to"}
+    {"op": "update-fields", "id", "title", "fields": {name: {"from", "to"}}}
+    {"op": "reparent", "id", "title", "from": [parent ids], "to": [parent ids]}
+    {"op": "add-edge" | "remove-edge", "parentId", "childId", "collectionName"}
+
+`reparent` is reported for nodes present in both snapshots whose set of
+parents changed; the edge records carry the details (including moves between
+collections of the same parent). Run it from the scripts directory:
+
+    python -m ontology_tools.snapshot_diff old-snapshot.json new-snapshot.json \\
+        --output changes.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import Counter
+from typing import Any, Iterator, Tuple
+
+from .snapshot import Snapshot, load_snapshot
+
+# Node fields with their own change record; every other field is compared too
+IDENTITY_FIELDS = ("id", "title", "description")
+
+Edge = Tuple[str, str, str]
+
+
+def _edges(snapshot: Snapshot) -> dict[Edge, None]:
+    """Edges as `(parentId, childId, collectionName)`, in snapshot order."""
+    return dict.fromkeys(
+        (edge["parentId"], edge["childId"], edge.get("collectionName") or "main")
+        for edge in snapshot["edges"]
+    )
+
+
+def _parents(edges: dict[Edge, None]) -> dict[str, list[str]]:
+    parents: dict[str, list[str]] = {}
+    for parent_id, child_id, _ in edges:
+        child_parents = parents.setdefault(child_id, [])
+        if parent_id not in child_parents:
+            child_parents.append(parent_id)
+    return parents
+
+
+def _field_changes(old: dict, new: dict) -> dict[str, dict[str, Any]]:
+    changes = {}
+    for name in list(old) + [name for name in new if name not in old]:
+        if name in IDENTITY_FIELDS:
+            continue
+        before, after = old.get(name), new.get(name)
+        if before != after:
+            changes[name] = {"from": before, "to": after}
+    return changes
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Iterator[dict[str, Any]]:
+    """Change log turning `old` into `new` (see the module docstring)."""
+    old_nodes = {node["id"]: node for node in old["nodes"]}
+    new_ids = set()
+
+    for node in new["nodes"]:
+        node_id = node["id"]
+        new_ids.add(node_id)
+        before = old_nodes.get(node_id)
+        title = node.get("title", "")
+        if before is None:
+            yield {"op": "add-node", "id": node_id, "title": title}
+            continue
+        if before.get("title", "") != title:
+            yield {
+                "op": "retitle",
+                "id": node_id,
+                "from": before.get("title", ""),
+                "to": title,
+            }
+        if (before.get("description") or "") != (node.get("description") or ""):
+            yield {
+                "op": "redescribe",
+                "id": node_id,
+                "title": title,
+                "from": before.get("description") or "",
+                "to": node.get("description") or "",
+            }
+        fields = _field_changes(before, node)
+        if fields:
+            yield {
+                "op": "update-fields",
+                "id": node_id,
+                "title": title,
+                "fields": fields,
+            }
+
+    for node_id, node in old_nodes.items():
+        if node_id not in new_ids:
+            yield {"op": "remove-node", "id": node_id, "title": node.get("title", "")}
+
+    old_edges, new_edges = _edges(old), _edges(new)
+    old_parents, new_parents = _parents(old_edges), _parents(new_edges)
+    for node in new["nodes"]:
+        node_id = node["id"]
+        if node_id not in old_nodes:
+            continue
+        before = old_parents.get(node_id, [])
+        after = new_parents.get(node_id, [])
+        if set(before) != set(after):
+            yield {
+                "op": "reparent",
+                "id": node_id,
+                "title": node.get("title", ""),
+                "from": before,
+                "to": after,
+            }
+
+    for edges, other, op in (
+        (old_edges, new_edges, "remove-edge"),
+        (new_edges, old_edges, "add-edge"),
+    ):
+        for parent_id, child_id, collection in edges:
+            if (parent_id, child_id, collection) not in other:
+                yield {
+                    "op": op,
+                    "parentId": parent_id,
+                    "childId": child_id,
+                    "collectionName": collection,
+                }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("old", help="snapshot before")
+    parser.add_argument("new", help="snapshot after")
+    parser.add_argument(
+        "--output", default=None, help="write the change log (JSONL) here"
+    )
+    args = parser.parse_args(argv)
+
+    counts: Counter[str] = Counter()
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for change in diff_snapshots(load_snapshot(args.old), load_snapshot(args.new)):
+            counts[change["op"]] += 1
+            output.write(json.dumps(change, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            output.close()
+    summary = ", ".join(f"{op}: {count}" for op, count in sorted(counts.items()))
+    # Keep stdout for the change log when it is not written to a file
+    print(summary or "No changes", file=sys.stdout if args.output else sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Run telemetry for the classification scripts.
+
+`RunMetrics.record` takes one finished item: its per-stage timings (from the
+pipeline), every model result obtained for it (the first answer plus any
+re-requests) and whether it was classified. Each record is appended as one
+JSON line to the metrics file while the run progresses; `summary()` aggregates
+them into p50/p95 latencies per stage and per request, token totals and
+throughput, retry counts, total cost and, for runs that prune the ontology or
+use a model cascade, pruning coverage and escalation rate and savings;
+`finish()` writes that summary next to the metrics file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Iterable
+
+TOKEN_KEYS = ("input", "output", "thinking", "total")
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Linear-interpolated percentile (q in 0..100) of `values`, None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def distribution(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "total": round(sum(values), 3),
+        "mean": round(sum(values) / len(values), 3) if values else None,
+        "p50": _rounded(percentile(values, 50)),
+        "p95": _rounded(percentile(values, 95)),
+        "max": round(max(values), 3) if values else None,
+    }
+
+
+def _rounded(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
+
+
+def pruning_summary(records: list[dict]) -> dict:
+    """
+    Aggregate per-item pruning records (see ontology_tools.pruning): how much
+    of the ontology was kept and how often the chosen node was inside it.
+    """
+    judged = [
+        r["chosenInPruned"] for r in records if r.get("chosenInPruned") is not None
+    ]
+    full_tokens = sum(r.get("fullTokens", 0) for r in records)
+    kept_tokens = sum(r.get("keptTokens", 0) for r in records)
+    return {
+        "items": len(records),
+        "pruned": sum(1 for r in records if r.get("pruned")),
+        "fullNodes": distribution([r.get("fullNodes", 0) for r in records]),
+        "keptNodes": distribution([r.get("keptNodes", 0) for r in records]),
+        "fullTokens": full_tokens,
+        "keptTokens": kept_tokens,
+        "keptTokenShare": round(kept_tokens / full_tokens, 3)
+        if full_tokens
+        else None,
+        "chosenInPruned": sum(judged),
+        "coverage": round(sum(judged) / len(judged), 3) if judged else None,
+    }
+
+
+def cascade_summary(records: list[dict]) -> dict:
+    """
+    Aggregate per-item cascade records (see ontology_tools.cascade). Savings
+    are estimated against sending every item to the final model: escalated
+    items at what their final tier cost, the others at their first-tier tokens
+    priced at the final model's rates. A higher final reasoning effort would
+    use more tokens, so the savings are a lower bound.
+    """
+    escalated = [r for r in records if r["escalated"]]
+    reasons: dict[str, int] = {}
+    for record in escalated:
+        reasons[record["reason"]] = reasons.get(record["reason"], 0) + 1
+    first_cost = sum(r["firstCost"] for r in records)
+    final_cost = sum(r["finalCost"] for r in records)
+    all_final = sum(
+        r["finalCost"] if r["escalated"] else r.get("firstAtFinalCost", 0)
+        for r in records
+    )
+    return {
+        "items": len(records),
+        "escalated": len(escalated),
+        "escalationRate": round(len(escalated) / len(records), 3),
+        "reasons": reasons,
+        "firstCost": round(first_cost, 6),
+        "finalCost": round(final_cost, 6),
+        "estimatedAllFinalCost": round(all_final, 6),
+        "estimatedSavings": round(all_final - first_cost - final_cost, 6),
+    }
+
+
+class RunMetrics:
+    def __init__(self, metrics_path: str | None = None, run_id: str | None = None):
+        self.metrics_path = metrics_path
+        # The random suffix keeps runs started in the same second apart (the
+        # SQLite result store keys its rows by run id)
+        self.run_id = run_id or (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        )
+        self.started = time.perf_counter()
+        self.records: list[dict] = []
+        self._lock = threading.Lock()
+        self._file = open(metrics_path, "w", encoding="utf-8") if metrics_path else None
+
+    def record(
+        self,
+        item_id: str,
+        stages: dict[str, float] | None = None,
+        results: Iterable[dict] = (),
+        classified: bool = False,
+        error: str | None = None,
+        **extra: Any,
+    ) -> dict:
+        """
+        Record one item. `results` are the result dicts of every model call
+        made for it (see ontology_tools.llm); failed calls count as requests
+        without tokens.
+        """
+        results = [result for result in results if result]
+        tokens = dict.fromkeys(TOKEN_KEYS, 0)
+        cost = 0.0
+        request_seconds = []
+        parse_statuses = []
+        streaming = None
+        usage_unreported = 0
+        for result in results:
+            for key in TOKEN_KEYS:
+                tokens[key] += int((result.get("usedTokens") or {}).get(key, 0) or 0)
+            cost += float((result.get("cost") or {}).get("totalCost", 0) or 0)
+            if result.get("executionTime"):
+                request_seconds.append(result["executionTime"] / 1000)
+            if "parseStatus" in result:
+                parse_statuses.append(result["parseStatus"])
+            streaming = result.get("streaming") or streaming
+            if not (result.get("streaming") or {}).get("usageReported", True):
+                usage_unreported += 1
+
+        record = {
+            "runId": self.run_id,
+            "item": item_id,
+            "classified": classified,
+            "error": error,
+            "stages": {name: round(value, 4) for name, value in (stages or {}).items()},
+            "requests": len(results),
+            "retries": max(0, len(results) - 1),
+            "requestSeconds": [round(value, 3) for value in request_seconds],
+            "parseStatus": parse_statuses,
+            "tokens": tokens,
+            "cost": round(cost, 6),
+            **extra,
+        }
+        if streaming:
+            record["streaming"] = streaming
+        if usage_unreported:
+            # Streams that ended without usage; their tokens and cost are unknown
+            record["usageUnreported"] = usage_unreported
+        with self._lock:
+            self.records.append(record)
+            if self._file:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+        return record
+
+    def summary(self, scheduler_stats: dict | None = None) -> dict:
+        with self._lock:
+            records = list(self.records)
+        wall_seconds = time.perf_counter() - self.started
+
+        stage_names: list[str] = []
+        for record in records:
+            for name in record["stages"]:
+                if name not in stage_names:
+                    stage_names.append(name)
+        stages = {
+            name: distribution(
+                [r["stages"][name] for r in records if name in r["stages"]]
+            )
+            for name in stage_names
+        }
+        tokens = {
+            key: sum(record["tokens"][key] for record in records) for key in TOKEN_KEYS
+        }
+        first_token = [
+            r["streaming"]["timeToFirstToken"]
+            for r in records
+            if r.get("streaming") and r["streaming"].get("timeToFirstToken")
+        ]
+        valid_object = [
+            r["streaming"]["timeToValidObject"]
+            for r in records
+            if r.get("streaming") and r["streaming"].get("timeToValidObject")
+        ]
+        parse_statuses: dict[str, int] = {}
+        for record in records:
+            for status in record["parseStatus"]:
+                parse_statuses[status] = parse_statuses.get(status, 0) + 1
+
+        summary = {
+            "runId": self.run_id,
+            "items": len(records),
+            "classified": sum(1 for r in records if r["classified"]),
+            "failed": sum(1 for r in records if not r["classified"]),
+            "wallSeconds": round(wall_seconds, 3),
+            "itemsPerMinute": round(60 * len(records) / wall_seconds, 2)
+            if wall_seconds
+            else None,
+            "stages": stages,
+            "requestSeconds": distribution(
+                [value for r in records for value in r["requestSeconds"]]
+            ),
+            "requests": sum(r["requests"] for r in records),
+            "retries": sum(r["retries"] for r in records),
+            "parseStatus": parse_statuses,
+            "tokens": tokens,
+            "tokensPerSecond": round(tokens["total"] / wall_seconds, 1)
+            if wall_seconds
+            else None,
+            "cost": round(sum(r["cost"] for r in records), 6),
+        }
+        pruning = [r["pruning"] for r in records if r.get("pruning")]
+        if pruning:
+            summary["pruning"] = pruning_summary(pruning)
+        cascade = [r["cascade"] for r in records if r.get("cascade")]
+        if cascade:
+            summary["cascade"] = cascade_summary(cascade)
+        usage_unreported = sum(r.get("usageUnreported", 0) for r in records)
+        if usage_unreported:
+            summary["usageUnreportedRequests"] = usage_unreported
+        if first_token:
+            summary["timeToFirstToken"] = distribution(first_token)
+            summary["timeToValidObject"] = distribution(valid_object)
+        if scheduler_stats is not None:
+            summary["scheduler"] = dict(scheduler_stats)
+        return summary
+
+    def finish(self, scheduler_stats: dict | None = None) -> dict:
+        """Close the metrics file, write the summary next to it and return it."""
+        summary = self.summary(scheduler_stats)
+        if self._file:
+            self._file.close()
+            self._file = None
+            summary_path = f"{os.path.splitext(self.metrics_path)[0]}.summary.json"
+            with open(summary_path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+                f.write("\n")
+        return summary
+
+
+class Progress:
+    """Thread-safe completed/total counter with a throughput-based ETA."""
+
+    def __init__(self, total: int | None = None) -> None:
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def advance(self, count: int = 1) -> str:
+        """Count `count` more items done and describe the progress."""
+        with self._lock:
+            self.done += count
+            done = self.done
+        elapsed = time.perf_counter() - self.started
+        if not self.total:
+            return f"{done} done in {elapsed:.0f}s"
+        text = f"{done}/{self.total} ({done / self.total:.1%})"
+        if done and done < self.total:
+            remaining = elapsed / done * (self.total - done)
+            minutes, seconds = divmod(int(remaining), 60)
+            text += f", ETA {minutes // 60}h{minutes % 60:02d}m{seconds:02d}s"
+        return text
+
+
+def format_summary(summary: dict) -> str:
+    """A few readable lines for the end of a run."""
+    lines = [
+        f"Run {summary['runId']}: {summary['classified']}/{summary['items']} items "
+        f"classified in {summary['wallSeconds']:.1f}s "
+        f"({summary['itemsPerMinute']} items/min)",
+        f"Requests: {summary['requests']} ({summary['retries']} re-requests), "
+        f"tokens: {summary['tokens']['total']} "
+        f"({summary['tokensPerSecond']} tokens/s), cost: ${summary['cost']:.4f}",
+    ]
+    request = summary["requestSeconds"]
+    if request["count"]:
+        lines.append(
+            f"Model call latency: p50 {request['p50']}s, p95 {request['p95']}s"
+        )
+    pruning = summary.get("pruning")
+    if pruning:
+        lines.append(
+            f"Pruning: kept {pruning['keptTokens']} of {pruning['fullTokens']} "
+            f"estimated ontology tokens, chosen node inside the pruned set for "
+            f"{pruning['chosenInPruned']} items (coverage {pruning['coverage']})"
+        )
+    cascade = summary.get("cascade")
+    if cascade:
+        lines.append(
+            f"Cascade: {cascade['escalated']}/{cascade['items']} items escalated "
+            f"({cascade['escalationRate']:.1%}), "
+            f"first tier ${cascade['firstCost']:.4f}, "
+            f"final tier ${cascade['finalCost']:.4f}, estimated savings "
+            f"${cascade['estimatedSavings']:.4f}"
+        )
+    for name, stage in summary["stages"].items():
+        lines.append(
+            f"  {name}: p50 {stage['p50']}s, p95 {stage['p95']}s, "
+            f"total {stage['total']}s"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,195 @@
+"""
+Resolve free-text node titles returned by the model to ontology node ids.
+
+`most_appropriate_node.title` is free text: it can be mis-cased, carry or lose a
+"(1)" disambiguation suffix or a synonym list, or be slightly paraphrased. A
+`TitleIndex` over an `OntologyGraph` resolves such a title in three steps:
+
+1. "exact": the title of a node, character for character,
+2. "normalized": equal after `normalize_label` (the rules of the hierarchy
+   comparison) and case folding; a dictionary lookup,
+3. "fuzzy": the normalized titles sharing the most character trigrams with the
+   query are rescored by edit similarity (difflib ratio) and the best one is
+   taken if it scores at least `min_score`.
+
+Every resolution has a `score` between 0 and 1 (1 for the first two steps).
+A normalized title that belongs to several nodes is marked `ambiguous`.
+
+To check a classification CSV against a snapshot (from the scripts directory):
+
+    python -m ontology_tools.titles ontology-snapshot.json taaft_output.csv \\
+        --column SAClassification --separator ": " --output resolved.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import difflib
+import time
+from collections import Counter
+from typing import Any, Iterable
+
+from .compiled import load_graph
+from .graph import OntologyGraph
+from .labels import normalize_label
+
+NGRAM = 3
+# Fuzzy candidates (by shared trigrams) rescored by edit similarity
+FUZZY_CANDIDATES = 8
+
+
+def title_key(title: str) -> str:
+    return normalize_label(title or "").casefold()
+
+
+def trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i : i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class TitleIndex:
+    def __init__(self, graph: OntologyGraph) -> None:
+        self.graph = graph
+        self.nodes_by_key: dict[str, list[int]] = {}
+        for node, title in enumerate(graph.titles):
+            self.nodes_by_key.setdefault(title_key(title), []).append(node)
+        self.keys = list(self.nodes_by_key)
+        self.gram_counts = [len(trigrams(key)) for key in self.keys]
+        self.postings: dict[str, list[int]] = {}
+        for number, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                self.postings.setdefault(gram, []).append(number)
+        self._cache: dict[tuple[str, float], dict[str, Any]] = {}
+
+    def _result(
+        self, query: str, match: str | None, score: float, nodes: list[int]
+    ) -> dict[str, Any]:
+        node = nodes[0] if nodes else None
+        return {
+            "query": query,
+            "match": match,
+            "score": round(score, 4),
+            "id": None if node is None else self.graph.ids[node],
+            "title": None if node is None else self.graph.titles[node],
+            "ambiguous": len(nodes) > 1,
+            "ids": [self.graph.ids[n] for n in nodes],
+        }
+
+    def candidates(self, key: str, limit: int = FUZZY_CANDIDATES) -> list[str]:
+        """Keys sharing the most trigrams with `key` (by Dice coefficient)."""
+        grams = trigrams(key)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        ranked = sorted(
+            shared.items(),
+            key=lambda item: -2 * item[1] / (len(grams) + self.gram_counts[item[0]]),
+        )
+        return [self.keys[number] for number, _ in ranked[:limit]]
+
+    def resolve(self, title: str, min_score: float = 0.8) -> dict[str, Any]:
+        """Resolution of `title`; `match` is None when nothing scores high enough."""
+        cached = self._cache.get((title, min_score))
+        if cached is not None:
+            return cached
+        exact = self.graph.indices_of_title(title)
+        if exact:
+            result = self._result(title, "exact", 1.0, exact)
+        else:
+            key = title_key(title)
+            nodes = self.nodes_by_key.get(key)
+            if nodes:
+                result = self._result(title, "normalized", 1.0, nodes)
+            else:
+                best_key, best_score = None, 0.0
+                for candidate in self.candidates(key):
+                    score = difflib.SequenceMatcher(None, key, candidate).ratio()
+                    if score > best_score:
+                        best_key, best_score = candidate, score
+                if best_key is not None and best_score >= min_score:
+                    nodes = self.nodes_by_key[best_key]
+                    result = self._result(title, "fuzzy", best_score, nodes)
+                else:
+                    result = self._result(title, None, best_score, [])
+        self._cache[(title, min_score)] = result
+        return result
+
+    def resolve_many(
+        self, titles: Iterable[str], min_score: float = 0.8
+    ) -> list[dict[str, Any]]:
+        return [self.resolve(title, min_score) for title in titles]
+
+
+RESOLUTION_COLUMNS = [
+    "Resolved node id",
+    "Resolved title",
+    "Resolution",
+    "Resolution score",
+]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("ontology", help="snapshot, transformed or compiled file")
+    parser.add_argument("csv", help="classification output CSV")
+    parser.add_argument("--column", required=True, help="column holding the title")
+    parser.add_argument(
+        "--separator",
+        default=None,
+        help='the title is the text before this separator (e.g. ": " for '
+        "SAClassification)",
+    )
+    parser.add_argument("--min-score", type=float, default=0.8)
+    parser.add_argument(
+        "--correct",
+        action="store_true",
+        help="replace the title in the column with the resolved one (in --output)",
+    )
+    parser.add_argument("--output", default=None, help="CSV with resolution columns")
+    args = parser.parse_args(argv)
+    if args.correct and not args.output:
+        parser.error("--correct needs --output")
+
+    index = TitleIndex(load_graph(args.ontology))
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        rows = list(reader)
+
+    started = time.perf_counter()
+    counts: Counter[str] = Counter()
+    for row in rows:
+        value = row.get(args.column) or ""
+        title, sep, rest = (
+            value.partition(args.separator) if args.separator else (value, "", "")
+        )
+        title = title.strip()
+        if not title:
+            counts["empty"] += 1
+            continue
+        result = index.resolve(title, args.min_score)
+        counts[result["match"] or "unresolved"] += 1
+        row["Resolved node id"] = result["id"] or ""
+        row["Resolved title"] = result["title"] or ""
+        row["Resolution"] = (result["match"] or "unresolved") + (
+            " (ambiguous)" if result["ambiguous"] else ""
+        )
+        row["Resolution score"] = result["score"]
+        if args.correct and result["title"] and result["title"] != title:
+            row[args.column] = result["title"] + sep + rest
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{len(rows)} rows in {elapsed:.2f}s: "
+        + ", ".join(f"{match}: {count}" for match, count in sorted(counts.items()))
+    )
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames + RESOLUTION_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()